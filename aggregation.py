@@ -0,0 +1,356 @@
+"""Single-pass KPI aggregation over every dimension of the Profitability sheet.
+
+Rows are factorized into integer codes per dimension and reduced once, with
+``np.bincount``, to the finest-grain group (one row per distinct combination
+of dimension values). Every per-dimension view is then derived from that base
+table, so opening a view costs O(groups) rather than O(rows).
+"""
+import os
+import threading
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+KPI_COLUMNS = [
+    "Number of Transaction",
+    "GMV",
+    "Gross Revenue",
+    "Bank & PG Charges",
+    "Referral Charges",
+    "Net Earnings",
+]
+
+# Logical dimensions; schema.py resolves each to a sheet column
+DIMENSIONS = ["Product", "Zone", "BD", "AM", "Segment", "State"]
+
+# Rollup cuboids over at most this many dimensions are built up front; wider
+# ones (drill-downs) are built on first use. Each cuboid can hold up to as many
+# rows as the base table, and with six dimensions depth 2 means 22 cuboids and
+# depth 3 means 42, so raising this trades memory per workbook for a faster
+# first drill-down.
+EAGER_CUBE_DIMS = int(os.environ.get("CXO_CUBE_EAGER_DIMS", "1"))
+
+# Dashboard view -> (logical dimension, KPIs shown in that view)
+DIMENSION_VIEWS = {
+    "Product Wise": ("Product", ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]),
+    "Zone Wise": ("Zone", ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]),
+    "BD Wise": ("BD", ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]),
+    "AM Wise": ("AM", ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]),
+    "Segment Wise": ("Segment", ["GMV", "Gross Revenue", "Net Earnings"]),
+    "State Wise": ("State", ["GMV", "Gross Revenue", "Net Earnings"]),
+}
+
+
+def _group_ids(codes, sizes):
+    """Group id per row of a (rows x dimensions) code array, and the number of groups."""
+    if not sizes:
+        return np.zeros(len(codes), dtype=np.int64), min(len(codes), 1)
+    if np.prod(sizes, dtype=np.float64) < 2 ** 62:
+        compound = np.ravel_multi_index(codes.T, sizes)
+    else:
+        # Too many combinations to pack into one int64 key
+        compound = pd.MultiIndex.from_arrays(codes.T)
+    inverse, uniques = pd.factorize(compound)
+    return inverse, len(uniques)
+
+
+class DimensionAggregator:
+    """Accumulates KPI sums per distinct combination of dimension values.
+
+    ``add`` may be called repeatedly (e.g. once per row block); label codes are
+    kept global so blocks fold into the same base table.
+    """
+
+    def __init__(self, dimension_columns, kpis):
+        self.dimension_columns = dict(dimension_columns)
+        self.dimensions = list(self.dimension_columns)
+        self.kpis = list(kpis)
+        self.row_count = 0
+        # Code 0 is reserved for a missing value; label i has code i + 1
+        self._labels = {dim: pd.Index([], dtype=object) for dim in self.dimensions}
+        self._codes = np.empty((0, len(self.dimensions)), dtype=np.int64)
+        self._sums = np.empty((0, len(self.kpis)), dtype=np.float64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._integer = {kpi: True for kpi in self.kpis}
+        self._views = {}
+
+    @property
+    def nbytes(self):
+        labels = sum(int(idx.memory_usage(deep=True)) for idx in self._labels.values())
+        views = sum(int(df.memory_usage(deep=True).sum()) for df in self._views.values())
+        return self._codes.nbytes + self._sums.nbytes + self._counts.nbytes + labels + views
+
+    def add(self, frame):
+        n = len(frame)
+        if n == 0:
+            return
+        # Column-major so each dimension/KPI is written as one contiguous column
+        codes = np.empty((n, len(self.dimensions)), dtype=np.int64, order="F")
+        for j, dim in enumerate(self.dimensions):
+            block_codes, uniques = pd.factorize(frame[self.dimension_columns[dim]])
+            labels = self._labels[dim]
+            uniques = pd.Index(uniques, dtype=object)
+            new = uniques[~uniques.isin(labels)]
+            if len(new):
+                labels = labels.append(new)
+                self._labels[dim] = labels
+            # Shift by one so factorize's -1 (missing) lands on code 0
+            global_codes = np.concatenate([[0], labels.get_indexer(uniques) + 1])
+            codes[:, j] = global_codes[block_codes + 1]
+
+        values = np.empty((n, len(self.kpis)), dtype=np.float64, order="F")
+        for k, kpi in enumerate(self.kpis):
+            col = frame[kpi]
+            if not pd.api.types.is_integer_dtype(col):
+                self._integer[kpi] = False
+                col = pd.to_numeric(col, errors="coerce")
+            values[:, k] = np.nan_to_num(col.to_numpy(dtype=np.float64, na_value=np.nan))
+
+        self._merge(codes, values, np.ones(n, dtype=np.int64))
+        self.row_count += n
+
+    def _merge(self, codes, sums, counts):
+        if len(self._codes):
+            codes = np.vstack([self._codes, codes])
+            sums = np.vstack([self._sums, sums])
+            counts = np.concatenate([self._counts, counts])
+
+        sizes = [len(self._labels[dim]) + 1 for dim in self.dimensions]
+        self._codes, self._sums, self._counts = _reduce(codes, sums, counts, sizes)
+        self._views.clear()
+
+    def _column(self, k, sums):
+        if self._integer[self.kpis[k]]:
+            return np.rint(sums).astype(np.int64)
+        return sums
+
+    def base_table(self):
+        """One row per distinct combination of dimension values, with KPI sums and row counts.
+
+        Dimension columns are named by logical dimension ("Product", "Zone", ...).
+        """
+        data = {}
+        for j, dim in enumerate(self.dimensions):
+            # Prepend a missing-value slot so code 0 maps to None
+            labels = np.concatenate([[None], self._labels[dim].to_numpy(dtype=object)])
+            data[dim] = labels[self._codes[:, j]]
+        for k, kpi in enumerate(self.kpis):
+            data[kpi] = self._column(k, self._sums[:, k])
+        data["Rows"] = self._counts
+        return pd.DataFrame(data)
+
+    def dimension(self, dim):
+        """KPI sums grouped by one dimension, sorted by label like ``groupby``."""
+        if dim in self._views:
+            return self._views[dim]
+        j = self.dimensions.index(dim)
+        labels = self._labels[dim]
+        size = len(labels) + 1
+        codes = self._codes[:, j]
+        data = {self.dimension_columns[dim]: labels.to_numpy()}
+        for k, kpi in enumerate(self.kpis):
+            data[kpi] = self._column(k, np.bincount(codes, weights=self._sums[:, k], minlength=size)[1:])
+        grouped = pd.DataFrame(data)
+        try:
+            grouped = grouped.sort_values(self.dimension_columns[dim], kind="stable", ignore_index=True)
+        except TypeError:  # mixed label types cannot be ordered
+            pass
+        self._views[dim] = grouped
+        return grouped
+
+    def view(self, dim, kpis):
+        """A copy of ``dimension(dim)`` restricted to the KPIs present in the sheet."""
+        grouped = self.dimension(dim)
+        return grouped[[self.dimension_columns[dim]] + [k for k in kpis if k in grouped.columns]].copy()
+
+    def totals(self):
+        """Column sums of every KPI as ``RunningTotals``, read off the base table (O(groups))."""
+        totals = RunningTotals(self.kpis)
+        sums = self._sums.sum(axis=0)
+        totals.sums = {kpi: self._column(k, sums[k]).item() for k, kpi in enumerate(self.kpis)}
+        totals.row_count = self.row_count
+        return totals
+
+    def finalize(self):
+        for dim in self.dimensions:
+            self.dimension(dim)
+        return self
+
+
+def aggregate_dimensions(df, dimension_columns, kpis):
+    """Aggregate ``df`` for every resolved dimension (see ``schema.resolve``) in one pass."""
+    aggregator = DimensionAggregator(dimension_columns, kpis)
+    aggregator.add(df)
+    return aggregator.finalize()
+
+
+class RollupCube:
+    """Pre-aggregated KPI sums for every combination of dimensions.
+
+    Built from a finalized ``DimensionAggregator``. Cuboids over up to
+    ``eager_dims`` dimensions are computed up front, each reduced from its
+    smallest already-computed parent; wider cuboids are derived on first use.
+    Queries filter and reduce a cuboid in code space and only turn codes back
+    into labels for the result rows, so drill-downs cost O(groups), not O(rows).
+    The cube is shared by every session viewing the workbook, so building a
+    cuboid is serialized by a lock.
+    """
+
+    def __init__(self, aggregator, eager_dims=EAGER_CUBE_DIMS):
+        self.dimensions = list(aggregator.dimensions)
+        self.dimension_columns = dict(aggregator.dimension_columns)
+        self.kpis = list(aggregator.kpis)
+        self._labels = {dim: aggregator._labels[dim] for dim in self.dimensions}
+        self._integer = [aggregator._integer[kpi] for kpi in self.kpis]
+        self._lock = threading.Lock()
+        self._cuboids = {
+            tuple(self.dimensions): (aggregator._codes, aggregator._sums, aggregator._counts),
+        }
+        for r in range(min(eager_dims, len(self.dimensions)), -1, -1):
+            for dims in combinations(self.dimensions, r):
+                self._cuboid(dims)
+
+    @property
+    def nbytes(self):
+        # The base cuboid is the aggregator's arrays, counted there
+        base = tuple(self.dimensions)
+        with self._lock:
+            cuboids = [cuboid for dims, cuboid in self._cuboids.items() if dims != base]
+        return sum(codes.nbytes + sums.nbytes + counts.nbytes for codes, sums, counts in cuboids)
+
+    def _canonical(self, dims):
+        dims = set(dims)
+        return tuple(dim for dim in self.dimensions if dim in dims)
+
+    def _cuboid(self, dims):
+        with self._lock:
+            cuboid = self._cuboids.get(dims)
+            if cuboid is not None:
+                return cuboid
+            wanted = set(dims)
+            parent = min(
+                (key for key in self._cuboids if wanted <= set(key)),
+                key=lambda key: len(self._cuboids[key][2]),
+            )
+            codes, sums, counts = self._cuboids[parent]
+            cuboid = _reduce(codes[:, [parent.index(dim) for dim in dims]], sums, counts, self._sizes(dims))
+            self._cuboids[dims] = cuboid
+            return cuboid
+
+    def _sizes(self, dims):
+        return [len(self._labels[dim]) + 1 for dim in dims]
+
+    def _codes_for(self, dim, values):
+        if not isinstance(values, (list, tuple, set, np.ndarray, pd.Index)):
+            values = [values]
+        values = list(values)
+        missing = [v for v in values if v is None or (not isinstance(v, str) and pd.isna(v))]
+        present = [v for v in values if not any(v is m for m in missing)]
+        found = self._labels[dim].get_indexer(pd.Index(present, dtype=object)) if present else np.empty(0, dtype=np.int64)
+        codes = found[found >= 0] + 1
+        return np.append(codes, 0) if missing else codes
+
+    def query(self, group_by, filters=None, kpis=None):
+        """KPI sums and row counts grouped by ``group_by`` for rows matching ``filters``.
+
+        ``filters`` maps a dimension to a value or a list of accepted values.
+        Columns are named by logical dimension; rows are sorted by label.
+        """
+        group_by = list(dict.fromkeys(group_by))
+        filters = dict(filters or {})
+        kpis = self.kpis if kpis is None else [kpi for kpi in kpis if kpi in self.kpis]
+        dims = self._canonical(list(group_by) + list(filters))
+        codes, sums, counts = self._cuboid(dims)
+
+        if filters:
+            mask = np.ones(len(codes), dtype=bool)
+            for dim, values in filters.items():
+                mask &= np.isin(codes[:, dims.index(dim)], self._codes_for(dim, values))
+            codes, sums, counts = codes[mask], sums[mask], counts[mask]
+        target = self._canonical(group_by)
+        if target != dims:
+            codes, sums, counts = _reduce(codes[:, [dims.index(dim) for dim in target]], sums, counts, self._sizes(target))
+
+        data = {}
+        for dim in group_by:
+            # Prepend a missing-value slot so code 0 maps to None
+            labels = np.concatenate([[None], self._labels[dim].to_numpy(dtype=object)])
+            data[dim] = labels[codes[:, target.index(dim)]]
+        for kpi in kpis:
+            k = self.kpis.index(kpi)
+            data[kpi] = np.rint(sums[:, k]).astype(np.int64) if self._integer[k] else sums[:, k]
+        data["Rows"] = counts
+        result = pd.DataFrame(data)
+        if group_by:
+            try:
+                result = result.sort_values(group_by, kind="stable", ignore_index=True)
+            except TypeError:  # mixed label types cannot be ordered
+                pass
+        return result
+
+    def values(self, dim, filters=None):
+        """Distinct values of ``dim`` among rows matching ``filters``."""
+        return list(self.query([dim], filters, kpis=[])[dim])
+
+
+def _reduce(codes, sums, counts, sizes):
+    """Sum rows that share the same dimension codes into one row per group."""
+    inverse, n_groups = _group_ids(codes, sizes)
+    reduced_codes = np.empty((n_groups, codes.shape[1]), dtype=np.int64)
+    reduced_codes[inverse] = codes
+    reduced_sums = np.empty((n_groups, sums.shape[1]), dtype=np.float64)
+    for k in range(sums.shape[1]):
+        reduced_sums[:, k] = np.bincount(inverse, weights=sums[:, k], minlength=n_groups)
+    reduced_counts = np.bincount(inverse, weights=counts, minlength=n_groups).astype(np.int64)
+    return reduced_codes, reduced_sums, reduced_counts
+
+
+def _column_sum(col):
+    if pd.api.types.is_integer_dtype(col):
+        return int(col.sum())
+    return float(pd.to_numeric(col, errors="coerce").sum())
+
+
+class RunningTotals:
+    """Column sums of the KPI columns, updated from appended row blocks."""
+
+    def __init__(self, kpis):
+        self.kpis = list(kpis)
+        self.row_count = 0
+        self.sums = {kpi: 0 for kpi in self.kpis}
+
+    def add(self, frame):
+        for kpi in self.kpis:
+            if kpi in frame.columns:
+                self.sums[kpi] += _column_sum(frame[kpi])
+        self.row_count += len(frame)
+        return self
+
+
+class TotalsTracker:
+    """KPI totals per uploaded workbook (source).
+
+    Totals come from the workbook's cached ``DimensionAggregator``, so a rerun
+    or a re-upload costs O(groups) rather than a scan of every row; a new
+    month's workbook adds a source whose totals are combined with the others.
+    """
+
+    def __init__(self):
+        self._sources = {}
+
+    def __len__(self):
+        return len(self._sources)
+
+    def update(self, source, digest, aggregator):
+        state = self._sources.get(source)
+        if state is None or state["digest"] != digest:
+            state = self._sources[source] = {"digest": digest, "totals": aggregator.totals()}
+        return state["totals"].sums
+
+    def combined(self):
+        combined = {}
+        for state in self._sources.values():
+            for kpi, value in state["totals"].sums.items():
+                combined[kpi] = combined.get(kpi, 0) + value
+        return combined
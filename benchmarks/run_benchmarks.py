@@ -0,0 +1,279 @@
+"""Headless benchmarks of the dashboard's load, aggregate, format and render paths.
+
+For every (rows, cardinality) pair a synthetic workbook is generated (see
+``synthetic.py``) and each stage is timed through the same functions the
+dashboard calls, per sheet and per view:
+
+* load: header sniffing, XLSX parse (cold) and snapshot read (warm), streaming
+* aggregate: schema validation, dimension aggregates, rollup cube, KPI totals,
+  drill-down query
+* format: the table each view sends to the browser, serialization included
+* render: the PNG each view draws, bypassing the chart cache
+
+An XLSX sheet holds at most ~1M rows and parsing it is slow, so load stages
+only run up to ``--max-load-rows``; larger sizes time the in-memory stages
+on the generated frame. Results are written as JSON lines (one record per
+stage, with environment details) and can be compared with ``--compare``:
+
+    python benchmarks/run_benchmarks.py --sizes 10k,100k,1m,5m --cardinality low,high
+    python benchmarks/run_benchmarks.py --compare results/before.jsonl results/after.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import streamlit.config
+import streamlit.logger
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import aggregation  # noqa: E402
+import charts  # noqa: E402
+import dashboard_summary  # noqa: E402
+import formatting  # noqa: E402
+import schema  # noqa: E402
+import sheet_loader  # noqa: E402
+import snapshot  # noqa: E402
+import streaming  # noqa: E402
+import synthetic  # noqa: E402
+import workbook_cache  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_SIZES = "10k,100k,1m"
+# "high" (5,000 AMs) is opt-in: its bar charts alone take minutes to draw
+DEFAULT_CARDINALITIES = "low,medium"
+DEFAULT_MAX_LOAD_ROWS = 100000
+DRILL_PATH = ["Zone", "State", "AM"]
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+class Suite:
+    """Times stages and collects one record per (sheet, stage, view)."""
+
+    def __init__(self, rows, cardinality, repeat, env):
+        self.rows = rows
+        self.cardinality = cardinality
+        self.repeat = repeat
+        self.env = env
+        self.records = []
+
+    def time(self, sheet, stage, fn, view=None, repeat=None, rows=None):
+        """Run ``fn`` ``repeat`` times and record the median and best wall time."""
+        timings, result = [], None
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+        self.records.append({
+            "rows": self.rows,
+            "cardinality": self.cardinality,
+            "sheet": sheet,
+            "stage": stage,
+            "view": view,
+            "median_s": statistics.median(timings),
+            "min_s": min(timings),
+            "repeat": len(timings),
+            "output_rows": rows if rows is not None else (len(result) if isinstance(result, pd.DataFrame) else None),
+            **self.env,
+        })
+        print(f"{self.rows:>9,} {self.cardinality:<7} {sheet:<18} {stage:<22} {view or '':<14} "
+              f"{statistics.median(timings) * 1000:>10.1f} ms", flush=True)
+        return result
+
+
+def bench_load(suite, workbook, work_dir):
+    data = workbook.read_bytes()
+    digest = workbook_cache.content_hash(data)
+    root = work_dir / "snapshots"
+    suite.time("workbook", "sniff headers", lambda: sheet_loader.sniff_headers(data), repeat=1)
+    # Cold parses write the snapshot; the warm read maps it back
+    df = suite.time("Profitability", "parse xlsx", lambda: snapshot.load_sheet(data, "Profitability", 0, digest, root), repeat=1)
+    if snapshot.enabled():
+        suite.time("Profitability", "read snapshot", lambda: snapshot.load_sheet(data, "Profitability", 0, digest, root))
+    suite.time("Profitability", "stream", lambda: streaming.stream_sheet(data, "Profitability"), repeat=1, rows=len(df))
+    suite.time("Dashboard Summary", "parse xlsx",
+               lambda: snapshot.load_sheet(data, "Dashboard Summary", 0, digest, root), repeat=1)
+    suite.time("P&L Summary", "parse xlsx", lambda: snapshot.load_sheet(data, "P&L Summary", 0, digest, root), repeat=1)
+    return df
+
+
+def bench_profitability(suite, df):
+    prepared = suite.time("Profitability", "validate schema", lambda: schema.prepare(df), rows=len(df))
+    frame, column_map = prepared.frame, prepared.column_map
+    aggregates = suite.time(
+        "Profitability", "aggregate dimensions",
+        lambda: aggregation.aggregate_dimensions(frame, column_map.dimensions, column_map.kpi_names),
+    )
+    cube = suite.time("Profitability", "rollup cube", lambda: aggregation.RollupCube(aggregates))
+    suite.time("Profitability", "KPI totals", lambda: aggregates.totals().sums)
+    path = [dim for dim in DRILL_PATH if dim in cube.dimensions]
+    if path:
+        first = cube.values(path[0])[0]
+        suite.time("Profitability", "drill query", lambda: cube.query(path[1:] or path, {path[0]: first}),
+                   view="Drill Down")
+    for view, (dim, kpis) in aggregation.DIMENSION_VIEWS.items():
+        dim_col = aggregates.dimension_columns.get(dim)
+        if not dim_col:
+            continue
+        grouped = suite.time("Profitability", "view", lambda: aggregates.view(dim, kpis), view=view)
+        suite.time("Profitability", "format", lambda: formatting.show_table(grouped), view=view, rows=len(grouped))
+        panels = charts.view_panels(view, grouped, dim_col, kpis)
+        kind = charts.VIEW_STYLES[view]["kind"]
+        suite.time("Profitability", "render", lambda: charts.render_panels(panels, kind), view=view, rows=len(grouped))
+
+
+def bench_dashboard_summary(suite, df_dash):
+    summary = suite.time("Dashboard Summary", "parse matrix", lambda: dashboard_summary.parse_matrix(df_dash))
+    metrics = [m for m in dashboard_summary.KPI_METRICS if m in summary]
+    suite.time("Dashboard Summary", "derived metrics",
+               lambda: summary.derived_frame(metrics, window=3, scale=formatting.LAC))
+    suite.time("Dashboard Summary", "format", lambda: formatting.show_table(df_dash), rows=len(df_dash))
+    lacs = summary.rows(metrics) / formatting.LAC
+    panels = [
+        charts.month_bar_panel(f"Month-wise {m}", summary.month_labels, values, f"{m} (Lacs)")
+        for m, values in zip(metrics, lacs)
+    ]
+    suite.time("Dashboard Summary", "render", lambda: charts.render_panels(panels, "bar", 1), rows=len(metrics))
+
+
+def bench_pl_summary(suite, df_pl):
+    df_pl = df_pl.dropna(how="all")
+    suite.time("P&L Summary", "format", lambda: formatting.show_table(df_pl), rows=len(df_pl))
+
+
+def run(sizes, cardinalities, repeat, max_load_rows, months, seed, work_dir):
+    env = environment()
+    records = []
+    for cardinality in cardinalities:
+        for rows in sizes:
+            suite = Suite(rows, cardinality, repeat, env)
+            if rows <= max_load_rows:
+                workbook = synthetic.write_workbook(work_dir / f"{cardinality}-{rows}.xlsx", rows, cardinality, months, seed)
+                df = bench_load(suite, workbook, work_dir)
+            else:
+                df = synthetic.profitability_frame(rows, cardinality, seed)
+            bench_profitability(suite, df)
+            bench_dashboard_summary(suite, synthetic.dashboard_summary_frame(months, seed))
+            bench_pl_summary(suite, synthetic.pl_summary_frame(seed=seed))
+            records.extend(suite.records)
+            del df
+    return records
+
+
+def _key(record):
+    return (record["rows"], record["cardinality"], record["sheet"], record["stage"], record["view"])
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def compare(baseline_path, candidate_path):
+    """Median-time ratio (candidate / baseline) for every stage present in both files."""
+    baseline = {_key(r): r for r in load_results(baseline_path)}
+    rows = []
+    for record in load_results(candidate_path):
+        before = baseline.get(_key(record))
+        if before is None:
+            continue
+        rows.append({
+            "rows": record["rows"],
+            "cardinality": record["cardinality"],
+            "sheet": record["sheet"],
+            "stage": record["stage"],
+            "view": record["view"] or "",
+            "baseline_ms": before["median_s"] * 1000,
+            "candidate_ms": record["median_s"] * 1000,
+            "ratio": record["median_s"] / before["median_s"] if before["median_s"] else float("nan"),
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Profitability rows, e.g. 10k,1m (default: {DEFAULT_SIZES})")
+    parser.add_argument("--cardinality", default=DEFAULT_CARDINALITIES,
+                        help=f"dimension cardinalities: {', '.join(synthetic.CARDINALITIES)} "
+                             f"(default: {DEFAULT_CARDINALITIES})")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per in-memory stage (default: 3)")
+    parser.add_argument("--max-load-rows", type=int, default=DEFAULT_MAX_LOAD_ROWS,
+                        help=f"largest size that is written to XLSX and parsed (default: {DEFAULT_MAX_LOAD_ROWS:,})")
+    parser.add_argument("--months", type=int, default=24, help="Dashboard Summary month columns (default: 24)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/<timestamp>.jsonl)")
+    parser.add_argument("--work-dir", help="keep generated workbooks and snapshots here (default: a temp dir)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"), help="compare two results files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        table = compare(*args.compare)
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(table.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+        return
+
+    cardinalities = [c.strip() for c in args.cardinality.split(",")]
+    unknown = set(cardinalities) - set(synthetic.CARDINALITIES)
+    if unknown:
+        parser.error(f"unknown cardinality: {', '.join(sorted(unknown))}")
+    if args.max_load_rows >= synthetic.XLSX_MAX_ROWS:
+        parser.error(f"--max-load-rows must be below {synthetic.XLSX_MAX_ROWS:,} (the XLSX row limit)")
+
+    # Tables are serialized without a browser attached; silence the bare-mode
+    # warnings (after the config is loaded, which would reset the level)
+    streamlit.config.get_option("logger.level")
+    streamlit.logger.set_log_level("error")
+
+    with tempfile.TemporaryDirectory(prefix="cxo-bench-") as tmp:
+        work_dir = Path(args.work_dir or tmp)
+        records = run(
+            [parse_size(s) for s in args.sizes.split(",")], cardinalities, args.repeat,
+            args.max_load_rows, args.months, args.seed, work_dir,
+        )
+
+    stamp = datetime.now(timezone.utc)
+    output = Path(args.output or RESULTS_DIR / f"{stamp:%Y%m%d-%H%M%S}.jsonl")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps({"ts": stamp.isoformat(timespec="seconds"), **record}) + "\n")
+    print(f"Wrote {len(records)} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
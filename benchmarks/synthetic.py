@@ -0,0 +1,166 @@
+"""Synthetic CXO workbooks with the same sheet layouts as the real ones.
+
+* Profitability: one row per transaction bucket with the Product, Zone, BD,
+  AM, Segment and State dimension columns and the six KPI columns.
+* Dashboard Summary: a Particulars x month matrix whose cells mix numbers and
+  "1,234,567"-style strings, as exported from the finance sheets.
+* P&L Summary: Particulars x financial year, with blank spacer rows.
+
+Generation is seeded, so the same arguments always give the same workbook.
+
+    python benchmarks/synthetic.py 100000 profitability.xlsx --cardinality high
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aggregation  # noqa: E402
+import dashboard_summary  # noqa: E402
+
+# Distinct values per dimension column
+CARDINALITIES = {
+    "low": {"Product": 4, "Zone": 4, "BD": 12, "AM": 60, "Segment": 3, "State": 20},
+    "medium": {"Product": 12, "Zone": 6, "BD": 80, "AM": 600, "Segment": 5, "State": 36},
+    "high": {"Product": 40, "Zone": 10, "BD": 400, "AM": 5000, "Segment": 12, "State": 36},
+}
+
+# Sheet column per logical dimension, as named in the real workbooks
+PROFITABILITY_COLUMNS = {
+    "Product": "Product Name",
+    "Zone": "Zone",
+    "BD": "BD Name",
+    "AM": "AM Name",
+    "Segment": "Segment",
+    "State": "State",
+}
+
+# (low, high) per KPI; Number of Transaction is a count, the rest are rupees
+KPI_RANGES = {
+    "Number of Transaction": (1, 500),
+    "GMV": (1000, 5000000),
+    "Gross Revenue": (10, 50000),
+    "Bank & PG Charges": (1, 5000),
+    "Referral Charges": (1, 5000),
+    "Net Earnings": (1, 40000),
+}
+
+SUMMARY_METRICS = [
+    "Revenue from Operations (A+B+C)",
+    "A. Payment Gateway Revenue",
+    "B. Value Added Services",
+    "C. Other Operating Revenue",
+    "Direct Expenses",
+    "Indirect Expenses",
+    "Employee Cost",
+    "EBITDA",
+    "Depreciation",
+    "PAT",
+    "Net Worth as on",
+]
+
+PL_LINES = [
+    "Revenue from Operations",
+    "Other Income",
+    "Total Income",
+    None,
+    "Direct Expenses",
+    "Employee Benefit Expenses",
+    "Other Expenses",
+    "Total Expenses",
+    None,
+    "EBITDA",
+    "Depreciation",
+    "Finance Cost",
+    "PBT",
+    "Tax",
+    "PAT",
+]
+
+# Excel's row limit, header row included
+XLSX_MAX_ROWS = 1048576
+
+
+def profitability_frame(rows, cardinality="low", seed=0):
+    """Profitability rows as ``pd.read_excel`` returns them (object labels, int64 KPIs)."""
+    sizes = CARDINALITIES[cardinality]
+    rng = np.random.default_rng(seed)
+    data = {}
+    for dim, col in PROFITABILITY_COLUMNS.items():
+        labels = np.array([f"{dim} {i:0{len(str(sizes[dim]))}d}" for i in range(sizes[dim])], dtype=object)
+        # Skewed like real books: a few products/AMs carry most of the volume
+        weights = 1 / np.arange(1, sizes[dim] + 1)
+        data[col] = labels[rng.choice(sizes[dim], rows, p=weights / weights.sum())]
+    for kpi in aggregation.KPI_COLUMNS:
+        low, high = KPI_RANGES[kpi]
+        data[kpi] = rng.integers(low, high, rows, dtype=np.int64)
+    return pd.DataFrame(data)
+
+
+def month_headers(months, start="2023-04"):
+    return [period.strftime("%b-%y") for period in pd.period_range(start, periods=months, freq="M")]
+
+
+def dashboard_summary_frame(months=24, seed=0):
+    """Particulars x month matrix; every other cell is a comma-formatted string."""
+    rng = np.random.default_rng(seed + 1)
+    values = rng.integers(100000, 90000000, (len(SUMMARY_METRICS), months))
+    cells = values.astype(object)
+    as_text = rng.random(values.shape) < 0.5
+    cells[as_text] = [f"{v:,}" for v in values[as_text]]
+    frame = pd.DataFrame(cells, columns=month_headers(months))
+    frame.insert(0, dashboard_summary.LABEL_COLUMN, SUMMARY_METRICS)
+    return frame
+
+
+def pl_summary_frame(years=3, seed=0):
+    rng = np.random.default_rng(seed + 2)
+    columns = [f"FY{24 - years + 1 + i}" for i in range(years)]
+    values = rng.integers(1000000, 500000000, (len(PL_LINES), years)).astype(np.float64)
+    spacer = np.array([line is None for line in PL_LINES])
+    values[spacer] = np.nan
+    frame = pd.DataFrame(values, columns=columns)
+    frame.insert(0, "Particulars", PL_LINES)
+    return frame
+
+
+def _write_frame(wb, title, frame):
+    ws = wb.create_sheet(title)
+    ws.append([str(col) for col in frame.columns])
+    for row in frame.itertuples(index=False, name=None):
+        ws.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+
+
+def write_workbook(path, rows, cardinality="low", months=24, seed=0):
+    """Write a three-sheet workbook to ``path`` and return the path."""
+    if rows >= XLSX_MAX_ROWS:
+        raise ValueError(f"an XLSX sheet holds at most {XLSX_MAX_ROWS - 1:,} data rows")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-only mode streams rows to disk instead of building the sheet in memory
+    wb = openpyxl.Workbook(write_only=True)
+    _write_frame(wb, "Profitability", profitability_frame(rows, cardinality, seed))
+    _write_frame(wb, "Dashboard Summary", dashboard_summary_frame(months, seed))
+    _write_frame(wb, "P&L Summary", pl_summary_frame(seed=seed))
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("rows", type=int, help="Profitability data rows")
+    parser.add_argument("output", help="workbook to write (.xlsx)")
+    parser.add_argument("--cardinality", choices=sorted(CARDINALITIES), default="low")
+    parser.add_argument("--months", type=int, default=24, help="Dashboard Summary month columns")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(write_workbook(args.output, args.rows, args.cardinality, args.months, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Cached, batched chart rendering for the dashboard views.
+
+A view's KPIs are drawn as subplots of a single figure and rendered once to
+PNG bytes. The bytes are cached keyed on (view, KPIs, hash of the plotted
+data, style), so revisiting a view serves the cached image without any
+matplotlib work. Figures are built with ``matplotlib.figure.Figure`` rather
+than pyplot, so they are never registered globally and are released as soon
+as the PNG is written.
+
+matplotlib is imported, and the chart font resolved, the first time a chart
+is drawn rather than at startup. ``prewarm`` does that work ahead of time:
+``start_prewarm`` runs it in a background thread of the server process, and
+``python charts.py prewarm`` builds matplotlib's on-disk font cache before
+the server starts.
+"""
+import argparse
+import functools
+import hashlib
+import io
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+import formatting
+from workbook_cache import SheetCache
+
+PNG_DPI = 100
+# Rendered PNGs kept in memory (bytes)
+CHART_CACHE_BYTES = 64 * 1024 * 1024
+
+# Chart style per dimension view
+VIEW_STYLES = {
+    "Product Wise": {"kind": "pie", "name": "Product", "legend_title": "Products"},
+    "Zone Wise": {"kind": "pie", "name": "Zone", "legend_title": "Zones"},
+    "BD Wise": {"kind": "bar", "name": "BD", "colors": ["#1f77b4"]},
+    "AM Wise": {"kind": "bar", "name": "AM", "colors": ["#ff7f0e"]},
+    "Segment Wise": {"kind": "pie", "name": "Segment", "legend_title": "Segments"},
+    "State Wise": {"kind": "bar", "name": "State", "colors": ["#1f77b4", "#ff7f0e", "#2ca02c"]},
+}
+
+PANEL_SIZES = {"pie": (5.5, 3.0), "bar": (6.0, 3.5)}
+
+CHART_FONT = "Nunito"
+# Warm matplotlib in the background when the first session starts ("0" disables)
+PREWARM = os.environ.get("CXO_PREWARM", "1") != "0"
+
+_cache = SheetCache(max_bytes=CHART_CACHE_BYTES)
+_prewarm_lock = threading.Lock()
+_prewarm_thread = None
+
+
+@functools.lru_cache(maxsize=None)
+def load_matplotlib():
+    """Import matplotlib and resolve the chart font, once per process."""
+    import matplotlib
+    from matplotlib import font_manager
+
+    matplotlib.use("Agg")
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    matplotlib.rcParams["font.family"] = CHART_FONT if CHART_FONT in installed else "sans-serif"
+    return matplotlib
+
+
+def _style_key():
+    family = load_matplotlib().rcParams["font.family"]
+    return (tuple(family) if isinstance(family, list) else family, PNG_DPI)
+
+
+def _panels_hash(panels):
+    h = hashlib.sha1()
+    for panel in panels:
+        for key in sorted(panel):
+            value = panel[key]
+            h.update(key.encode())
+            if isinstance(value, np.ndarray) and value.dtype != object:
+                h.update(str(value.dtype).encode())
+                h.update(np.ascontiguousarray(value).tobytes())
+            else:
+                h.update(repr(value).encode())
+    return h.hexdigest()
+
+
+def _draw_pie(ax, panel):
+    values = np.nan_to_num(np.asarray(panel["values"], dtype=np.float64))
+    if (values < 0).any() or values.sum() <= 0:
+        ax.text(0.5, 0.5, "Not shown: values must be\npositive for a pie chart", ha="center", va="center")
+        ax.set_axis_off()
+    else:
+        colors = load_matplotlib().colormaps["tab20"].colors
+        wedges, _ = ax.pie(values, labels=None, startangle=90, colors=colors[:len(values)])
+        total = values.sum()
+        legend_labels = [f"{label}: {value / total * 100:.1f}%" for label, value in zip(panel["labels"], values)]
+        ax.legend(wedges, legend_labels, title=panel.get("legend_title"), loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
+    ax.set_title(panel["title"])
+
+
+def _draw_bar(ax, panel):
+    ax.bar([str(label) for label in panel["labels"]], panel["values"], color=panel.get("color", "#1f77b4"))
+    ax.set_title(panel["title"])
+    ax.set_xlabel(panel.get("xlabel", ""))
+    ax.set_ylabel(panel.get("ylabel", ""))
+    for tick in ax.get_xticklabels():
+        tick.set_rotation(45)
+        tick.set_horizontalalignment("right")
+
+
+_DRAW = {"pie": _draw_pie, "bar": _draw_bar}
+
+
+def render_panels(panels, kind, ncols=2):
+    """Draw ``panels`` as subplots of one figure and return PNG bytes."""
+    load_matplotlib()
+    from matplotlib.figure import Figure
+
+    ncols = max(1, min(ncols, len(panels)))
+    nrows = max(1, math.ceil(len(panels) / ncols))
+    width, height = PANEL_SIZES[kind]
+    fig = Figure(figsize=(width * ncols, height * nrows))
+    try:
+        axes = fig.subplots(nrows, ncols, squeeze=False).ravel()
+        for ax, panel in zip(axes, panels):
+            _DRAW[kind](ax, panel)
+        for ax in axes[len(panels):]:
+            ax.set_axis_off()
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=PNG_DPI, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        fig.clear()
+
+
+def chart_key(view, panels, kind, ncols=2):
+    """Identity of a rendered chart: view, layout, style and a hash of the plotted data."""
+    return (view, kind, ncols, _style_key(), _panels_hash(panels))
+
+
+def cached_render(view, panels, kind, ncols=2):
+    key = chart_key(view, panels, kind, ncols)
+    png = _cache.get(key)
+    if png is None:
+        png = render_panels(panels, kind, ncols)
+        _cache.put(key, png, nbytes=len(png))
+    return png
+
+
+def view_panels(view, grouped, label_col, kpis):
+    """Panel descriptions for one dimension view's KPI charts."""
+    style = VIEW_STYLES[view]
+    labels = grouped[label_col].astype(str).to_numpy()
+    panels = []
+    for idx, kpi in enumerate(k for k in kpis if k in grouped.columns):
+        if style["kind"] == "pie":
+            panels.append({
+                "title": f"{style['name']} wise {kpi} (Pie Chart)",
+                "labels": labels,
+                "values": grouped[kpi].to_numpy(),
+                "legend_title": style["legend_title"],
+            })
+        else:
+            colors = style["colors"]
+            panels.append({
+                "title": f"{style['name']} wise {kpi} (in Lacs)",
+                "labels": labels,
+                "values": formatting.to_lacs(grouped[kpi]),
+                "xlabel": str(label_col),
+                "ylabel": f"{kpi} (Lacs)",
+                "color": colors[idx % len(colors)],
+            })
+    return panels
+
+
+def month_bar_panel(title, months, values, ylabel, color="#1f77b4"):
+    return {
+        "title": title,
+        "labels": np.asarray(months).astype(str),
+        "values": np.asarray(values, dtype=np.float64),
+        "xlabel": "Month",
+        "ylabel": ylabel,
+        "color": color,
+    }
+
+
+def show_view(view, grouped, label_col, kpis):
+    panels = view_panels(view, grouped, label_col, kpis)
+    if panels:
+        st.image(cached_render(view, panels, VIEW_STYLES[view]["kind"]))
+
+
+def show_bars(key, panels, ncols=1):
+    """Render bar panels (e.g. month-wise graphs) through the same cache."""
+    if panels:
+        st.image(cached_render(key, panels, "bar", ncols))
+
+
+def prewarm():
+    """Import matplotlib, resolve the font and draw one chart of each kind; returns seconds taken."""
+    started = time.perf_counter()
+    labels = np.array(["A", "B"])
+    render_panels([{"title": "Prewarm", "labels": labels, "values": np.array([1.0, 2.0])}], "pie")
+    render_panels([{"title": "Prewarm", "labels": labels, "values": np.array([1.0, 2.0])}], "bar")
+    return time.perf_counter() - started
+
+
+def start_prewarm():
+    """Run ``prewarm`` once per process in a daemon thread (no-op when disabled)."""
+    global _prewarm_thread
+    if not PREWARM:
+        return None
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=prewarm, name="chart-prewarm", daemon=True)
+            _prewarm_thread.start()
+        return _prewarm_thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chart rendering utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("prewarm", help="Build matplotlib's font cache and draw a test chart")
+    parser.parse_args(argv)
+    seconds = prewarm()
+    print(f"Chart backend warmed in {seconds:.2f}s (font: {load_matplotlib().rcParams['font.family'][0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,27 @@
+import datetime
+import math
+import os
+import uuid
+
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import matplotlib.font_manager as fm
+
+import aggregation
+import charts
+import dashboard_summary
+import formatting
+import history_store
+import instrumentation
+import schema
+import sheet_loader
+import streaming
+import workbook_cache
+
+# Only the open tab's body runs on each rerun ("0" runs every tab, as before)
+LAZY_TABS = os.environ.get("CXO_LAZY_TABS", "1") != "0"
+# Keyed widgets inside tabs; Streamlit drops the state of widgets that were
+# not rendered in a run, so these are carried over while their tab is closed
+PERSISTED_WIDGETS = ("menu", "drill_", "compare_", "history_period", "period_range", "preview_page", "pl_col")
 
 # Inject Nunito font via custom CSS
 st.markdown("""
@@ -30,6 +49,20 @@ h1, h2, h3, h4, h5, h6 {
 st.set_page_config(page_title="CXO AI Dashboard", page_icon="📈", layout="wide")
 st.title("CXO Dashboard")
 
+for widget_key in list(st.session_state):
+    if str(widget_key).startswith(PERSISTED_WIDGETS):
+        st.session_state[widget_key] = st.session_state[widget_key]
+
+# matplotlib loads on the first chart; warm it up while the user picks a file
+charts.start_prewarm()
+
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+# Per-stage wall time, memory and row counts for this rerun (opt-in)
+recorder = instrumentation.Recorder(
+    st.sidebar.checkbox("Performance diagnostics", value=instrumentation.ENABLED, key="diagnostics"),
+    session_id,
+)
+
 st.markdown("""
 Welcome to the **CXO Dashboard**. This dashboard provides a high-level overview of key business metrics for executive decision-making. Upload your Excel file to get started, or use the sample data provided for demonstration.
 """)
@@ -39,20 +72,168 @@ Welcome to the **CXO Dashboard**. This dashboard provides a high-level overview
 uploaded_file = st.file_uploader("Upload your Excel file (Excel format: .xlsx)", type=["xlsx"])
 
 if uploaded_file is not None:
-    # Read all sheets
-    xls = pd.ExcelFile(uploaded_file)
-    sheet_names = xls.sheet_names
+    # Hash the upload once per file; parsed sheets are cached on this digest
+    file_bytes = uploaded_file.getvalue()
+    if st.session_state.get("upload_file_id") != uploaded_file.file_id:
+        st.session_state["upload_file_id"] = uploaded_file.file_id
+        with recorder.stage("hash upload"):
+            new_digest = workbook_cache.content_hash(file_bytes)
+        if st.session_state.get("upload_digest") != new_digest:
+            # A new workbook gets its own period guess, not the previous one's
+            st.session_state.pop("history_period", None)
+        st.session_state["upload_digest"] = new_digest
+    digest = st.session_state["upload_digest"]
+    # Hold the workbook in the process-wide cache while this session uses it
+    held_digest = st.session_state.get("held_digest")
+    if held_digest and held_digest != digest:
+        workbook_cache.release(held_digest, session_id)
+    workbook_cache.acquire(digest, session_id)
+    st.session_state["held_digest"] = digest
+
+    # Large uploads are streamed block by block instead of loaded whole
+    streamed_mode = st.sidebar.checkbox(
+        "Streaming ingestion (large files)",
+        value=uploaded_file.size > streaming.THRESHOLD_BYTES,
+        help="Aggregate the Profitability sheet block by block without keeping it in memory.",
+    )
+    # Parse all known sheets in parallel; each tab waits only for its own sheet
+    with recorder.stage("start sheet loader"):
+        loader = sheet_loader.start(
+            file_bytes,
+            digest,
+            [name for name in sheet_loader.KNOWN_SHEETS if not (streamed_mode and name == "Profitability")],
+        )
+    sheet_names = loader.sheet_names
+    history = history_store.default_store()
     # Use actual sheet names for tabs
     tab_names = sheet_names
-    tabs = st.tabs(tab_names)
+    lazy_tabs = st.sidebar.checkbox(
+        "Render only the open tab",
+        value=LAZY_TABS,
+        help="Skip computing and drawing the tabs you are not looking at.",
+    )
+    if lazy_tabs:
+        # Switching tabs reruns the script; closed tabs are skipped
+        tabs = st.tabs(tab_names, key="sheet_tab", on_change="rerun")
+    else:
+        tabs = st.tabs(tab_names)
+
+    def tab_open(name):
+        return name in sheet_names and (not lazy_tabs or tabs[sheet_names.index(name)].open)
+
+    sidebar_widgets = {}
+
+    def comparison_range(periods):
+        """The sidebar "Comparison period range", drawn by the first open tab that needs it."""
+        if "period_range" not in sidebar_widgets:
+            sidebar_widgets["period_range"] = st.sidebar.select_slider(
+                "Comparison period range",
+                options=periods,
+                value=(periods[0], periods[-1]),
+                key="period_range",
+            )
+        return sidebar_widgets["period_range"]
 
     # Profitability Tab (if exists)
-    if "Profitability" in sheet_names:
+    if tab_open("Profitability"):
         with tabs[sheet_names.index("Profitability")]:
-            df = pd.read_excel(xls, sheet_name="Profitability")
-            st.write("Columns found in your file:", list(df.columns))
+            with recorder.stage("load Profitability") as stage:
+                if streamed_mode:
+                    streamed = workbook_cache.get_or_compute(
+                        (digest, "streamed", "Profitability"),
+                        lambda: streaming.stream_sheet(file_bytes, "Profitability"),
+                    )
+                    columns, row_count = streamed.columns, streamed.row_count
+                else:
+                    df = loader.result("Profitability")
+                    columns, row_count = list(df.columns), len(df)
+                stage["rows"] = row_count
+            if not streamed_mode:
+                # Fields resolved to columns and KPI dtypes validated once per workbook
+                with recorder.stage("validate schema", rows=row_count):
+                    prepared = workbook_cache.get_or_compute(
+                        (digest, "prepared", "Profitability"),
+                        lambda: schema.prepare(df),
+                    )
+            column_map = streamed.column_map if streamed_mode else prepared.column_map
+            schema_issues = streamed.issues if streamed_mode else prepared.issues
+            st.write("Columns found in your file:", columns)
+            with st.expander("Column mapping", expanded=bool(schema_issues)):
+                st.dataframe(
+                    pd.DataFrame(column_map.describe(), columns=["Field", "Column"]), hide_index=True
+                )
+                for issue in schema_issues:
+                    st.warning(issue)
             st.subheader("Data Preview")
-            st.dataframe(df)
+            # Only a window of rows is sent to the browser
+            page_rows = streaming.PREVIEW_ROWS
+            if streamed_mode:
+                st.caption(f"Showing the first {len(streamed.preview):,} of {row_count:,} rows (streaming mode).")
+                with recorder.stage("preview table", rows=len(streamed.preview)):
+                    st.dataframe(streamed.preview)
+            else:
+                # Paging reruns only this fragment, not the views below
+                @st.fragment
+                def data_preview():
+                    page_count = max(1, math.ceil(row_count / page_rows))
+                    page = st.number_input(
+                        "Preview page", min_value=1, max_value=page_count, key="preview_page"
+                    ) if page_count > 1 else 1
+                    start = (page - 1) * page_rows
+                    st.caption(f"Rows {min(start + 1, row_count):,}-{min(start + page_rows, row_count):,} of {row_count:,}")
+                    st.dataframe(df.iloc[start:start + page_rows])
+
+                data_preview()
+
+            def dimension_aggregates():
+                # KPI sums for every dimension in one pass, computed once per workbook
+                if streamed_mode:
+                    return streamed.aggregator
+                with recorder.stage("dimension aggregates", rows=row_count):
+                    return workbook_cache.get_or_compute(
+                        (digest, "dimension_aggregates"),
+                        lambda: aggregation.aggregate_dimensions(
+                            prepared.frame, column_map.dimensions, column_map.kpi_names
+                        ),
+                    )
+
+            # Rollup cube shared by every session on this workbook: cuboids over
+            # up to CXO_CUBE_EAGER_DIMS dimensions are built here, wider
+            # drill-down combinations on first use
+            with recorder.stage("rollup cube"):
+                cube = workbook_cache.get_or_compute(
+                    (digest, "rollup_cube"),
+                    lambda: aggregation.RollupCube(dimension_aggregates()),
+                )
+
+            # Save this workbook once, tagged by month, for multi-period comparison
+            st.sidebar.subheader("History")
+            guessed_period = history_store.guess_period(uploaded_file.name)
+            period_date = st.sidebar.date_input(
+                "Workbook period (month)",
+                value=pd.Period(guessed_period).to_timestamp().date() if guessed_period else datetime.date.today(),
+                key="history_period",
+            )
+            period = history_store.period_key(period_date)
+            if history.contains(digest):
+                st.sidebar.caption("This workbook is saved in history.")
+            else:
+                if not guessed_period:
+                    st.sidebar.caption("No month in the file name; check the period before saving.")
+                # Saving over a stored month needs an explicit confirmation
+                stored_source = history.source(period)
+                replace = stored_source is not None and st.sidebar.checkbox(
+                    f"Replace {stored_source} stored for {period}", key=f"history_replace_{digest}_{period}"
+                )
+                if stored_source is not None and not replace:
+                    st.sidebar.warning(f"{period} already holds {stored_source}. Tick the box above to replace it.")
+                if st.sidebar.button("Save workbook to history", disabled=stored_source is not None and not replace):
+                    pl_frame = loader.result("P&L Summary") if "P&L Summary" in sheet_names else None
+                    history.ingest(digest, period, uploaded_file.name, dimension_aggregates(), pl_frame, replace=replace)
+                    st.sidebar.success(f"Saved as {period}.")
+            history_periods = history.periods()
+            if history_periods:
+                period_range = comparison_range(history_periods)
 
             # Sidebar menu with new options
             menu = st.sidebar.selectbox(
@@ -64,26 +245,18 @@ if uploaded_file is not None:
                     "BD Wise",
                     "AM Wise",
                     "Segment Wise",
-                    "State Wise"
-                ]
+                    "State Wise",
+                    "Drill Down"
+                ],
+                key="menu",
             )
             if menu == "KPI Card":
-                kpi_options = [
-                    "Number of Transaction",
-                    "GMV",
-                    "Gross Revenue",
-                    "Bank & PG Charges",
-                    "Referral Charges",
-                    "Net Earnings"
-                ]
-                kpi_values = {
-                    "Number of Transaction": 315432,
-                    "GMV": 2306914235,
-                    "Gross Revenue": 4081767,
-                    "Bank & PG Charges": 755049,
-                    "Referral Charges": 1255277,
-                    "Net Earnings": 2071441
-                }
+                kpi_options = aggregation.KPI_COLUMNS
+                # KPI totals per uploaded workbook, summed from the cached
+                # dimension aggregates rather than rescanning the rows
+                tracker = st.session_state.setdefault("kpi_totals", aggregation.TotalsTracker())
+                with recorder.stage("KPI totals", view=menu, rows=row_count):
+                    kpi_values = tracker.update(uploaded_file.name, digest, dimension_aggregates())
                 st.subheader("KPI Cards")
                 # Display KPIs in a grid with border and comma formatting
                 card_style = """
@@ -93,320 +266,137 @@ if uploaded_file is not None:
                 """
                 st.markdown(f"<div style='{card_style}'>", unsafe_allow_html=True)
                 for kpi in kpi_options:
-                    value = kpi_values[kpi]
-                    card_html = f"""
-                        <div style='border:2px solid #1f77b4; border-radius:8px; padding:16px; min-width:180px; margin-bottom:8px; background:#f9f9f9;'>
-                            <div style='font-size:16px; font-weight:bold;'>{kpi}</div>
-                            <div style='font-size:20px; color:#1f77b4; font-weight:bold;'>{value:,}</div>
-                        </div>
-                    """
-                    st.markdown(card_html, unsafe_allow_html=True)
+                    st.markdown(formatting.kpi_card_html(kpi, kpi_values.get(kpi)), unsafe_allow_html=True)
                 st.markdown("</div>", unsafe_allow_html=True)
-            elif menu == "Product Wise":
-                product_col = None
-                for col in df.columns:
-                    if "Product" in col:
-                        product_col = col
-                        break
-                if product_col:
-                    grouped = df.groupby(product_col).agg({
-                        "Number of Transaction": "sum",
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Pie Charts for Product Wise KPIs with legend and color
-                    kpi_list = ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]
-                    colors = plt.cm.tab20.colors
-                    for idx, kpi in enumerate(kpi_list):
-                        if kpi in grouped.columns:
-                            # Convert formatted string numbers back to int for plotting
-                            values = grouped[kpi].apply(lambda x: int(str(x).replace(",", ""))).values
-                            fig, ax = plt.subplots(figsize=(2, 2))
-                            wedges, texts = ax.pie(
-                                values,
-                                labels=None,
-                                startangle=90,
-                                colors=colors[:len(grouped[product_col])],
-                            )
-                            ax.set_title(f"Product wise {kpi} (Pie Chart)")
-                            total = sum(values)
-                            legend_labels = [f"{label}: {value/total*100:.1f}%" for label, value in zip(grouped[product_col], values)]
-                            ax.legend(wedges, legend_labels, title="Products", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-                            st.pyplot(fig)
-                else:
-                    st.warning("No 'Product' column found in your data.")
-            elif menu == "Zone Wise":
-                zone_col = None
-                for col in df.columns:
-                    if "Zone" in col:
-                        zone_col = col
-                        break
-                if zone_col:
-                    grouped = df.groupby(zone_col).agg({
-                        "Number of Transaction": "sum",
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Pie Charts for Zone Wise KPIs with legend and color
-                    colors = plt.cm.tab20.colors
-                    kpi_list = ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]
-                    for idx, kpi in enumerate(kpi_list):
-                        if kpi in grouped.columns:
-                            values = grouped[kpi].apply(lambda x: int(str(x).replace(",", ""))).values
-                            fig, ax = plt.subplots(figsize=(2, 3))
-                            wedges, texts = ax.pie(
-                                values,
-                                labels=None,
-                                startangle=90,
-                                colors=colors[:len(grouped[zone_col])],
-                            )
-                            ax.set_title(f"Zone wise {kpi} (Pie Chart)")
-                            total = sum(values)
-                            legend_labels = [f"{label}: {value/total*100:.1f}%" for label, value in zip(grouped[zone_col], values)]
-                            ax.legend(wedges, legend_labels, title="Zones", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-                            st.pyplot(fig)
-                else:
-                    st.warning("No 'Zone' column found in your data.")
-            elif menu == "BD Wise":
-                bd_col = None
-                for col in df.columns:
-                    if "BD" in col:
-                        bd_col = col
-                        break
-                if bd_col:
-                    grouped = df.groupby(bd_col).agg({
-                        "Number of Transaction": "sum",
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Simple Bar Charts for BD Wise KPIs (Y axis in Lacs)
-                    kpi_list = ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]
-                    for kpi in kpi_list:
-                        if kpi in grouped.columns:
-                            x_labels = grouped[bd_col].astype(str)
-                            y_values = grouped[kpi].apply(lambda x: int(str(x).replace(",", "")) / 100000)
-                            fig, ax = plt.subplots(figsize=(4, 3))
-                            ax.bar(x_labels, y_values, color='#1f77b4')
-                            ax.set_title(f"BD wise {kpi} (in Lacs)")
-                            ax.set_xlabel(bd_col)
-                            ax.set_ylabel(f"{kpi} (Lacs)")
-                            plt.xticks(rotation=45, ha='right')
-                            st.pyplot(fig)
+                if len(tracker) > 1:
+                    st.subheader(f"All uploaded workbooks ({len(tracker)})")
+                    combined = tracker.combined()
+                    for kpi in kpi_options:
+                        st.markdown(formatting.kpi_card_html(kpi, combined.get(kpi)), unsafe_allow_html=True)
+            elif menu == "Drill Down":
+                st.subheader("Drill Down")
+                drill_path = st.sidebar.multiselect(
+                    "Drill-down path",
+                    cube.dimensions,
+                    default=[dim for dim in ["Zone", "State", "AM"] if dim in cube.dimensions],
+                    help="Dimensions in drill order, e.g. Zone → State → AM, or Segment × Product.",
+                    key="drill_path",
+                )
+                drill_kpis = st.sidebar.multiselect("Drill-down KPIs", cube.kpis, default=cube.kpis, key="drill_kpis")
+                if not drill_path:
+                    st.info("Pick at least one dimension to drill into.")
                 else:
-                    st.warning("No 'BD' column found in your data.")
-            elif menu == "AM Wise":
-                am_col = None
-                for col in df.columns:
-                    if "AM" in col:
-                        am_col = col
-                        break
-                if am_col:
-                    grouped = df.groupby(am_col).agg({
-                        "Number of Transaction": "sum",
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Simple Bar Charts for AM Wise KPIs (Y axis in Lacs)
-                    kpi_list = ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"]
-                    for kpi in kpi_list:
-                        if kpi in grouped.columns:
-                            x_labels = grouped[am_col].astype(str)
-                            y_values = grouped[kpi].apply(lambda x: int(str(x).replace(",", "")) / 100000)
-                            fig, ax = plt.subplots()
-                            ax.bar(x_labels, y_values, color='#ff7f0e')
-                            ax.set_title(f"AM wise {kpi} (in Lacs)")
-                            ax.set_xlabel(am_col)
-                            ax.set_ylabel(f"{kpi} (Lacs)")
-                            plt.xticks(rotation=45, ha='right')
-                            st.pyplot(fig)
-                else:
-                    st.warning("No 'AM' column found in your data.")
-            elif menu == "Segment Wise":
-                segment_col = None
-                for col in df.columns:
-                    if "Segment" in col:
-                        segment_col = col
-                        break
-                if segment_col:
-                    grouped = df.groupby(segment_col).agg({
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Pie Charts for Segment Wise KPIs with legend and color
-                    colors = plt.cm.tab20.colors
-                    kpi_list = ["GMV", "Gross Revenue", "Net Earnings"]
-                    plt.rcParams['font.family'] = 'Nunito'
-                    for idx, kpi in enumerate(kpi_list):
-                        if kpi in grouped.columns:
-                            # Convert formatted string numbers back to int for plotting
-                            values = grouped[kpi].apply(lambda x: int(str(x).replace(",", ""))).values
-                            fig, ax = plt.subplots()
-                            wedges, texts = ax.pie(
-                                values,
-                                labels=None,
-                                startangle=90,
-                                colors=colors[:len(grouped[segment_col])],
-                            )
-                            ax.set_title(f"Segment wise {kpi} (Pie Chart)")
-                            total = sum(values)
-                            legend_labels = [f"{label}: {value/total*100:.1f}%" for label, value in zip(grouped[segment_col], values)]
-                            ax.legend(wedges, legend_labels, title="Segments", loc="center left", bbox_to_anchor=(1, 0, 0.5, 1))
-                            st.pyplot(fig)
-                else:
-                    st.warning("No 'Segment' column found in your data.")
-            elif menu == "State Wise":
-                state_col = None
-                for col in df.columns:
-                    if "State" in col:
-                        state_col = col
-                        break
-                if state_col:
-                    grouped = df.groupby(state_col).agg({
-                        "GMV": "sum",
-                        "Gross Revenue": "sum",
-                        "Net Earnings": "sum"
-                    }).reset_index()
-                    # Format numeric columns with commas
-                    for col in ["GMV", "Gross Revenue", "Net Earnings"]:
-                        if col in grouped.columns:
-                            grouped[col] = grouped[col].apply(lambda x: f"{int(x):,}")
-                    st.dataframe(grouped)
-                    # Bar Charts for State Wise KPIs (Y axis in Lacs)
-                    kpi_list = ["GMV", "Gross Revenue", "Net Earnings"]
-                    colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
-                    for idx, kpi in enumerate(kpi_list):
-                        if kpi in grouped.columns:
-                            x_labels = grouped[state_col].astype(str)
-                            y_values = grouped[kpi].apply(lambda x: int(str(x).replace(",", "")) / 100000)
-                            fig, ax = plt.subplots(figsize=(6, 3))
-                            ax.bar(x_labels, y_values, color=colors[idx % len(colors)])
-                            ax.set_title(f"State wise {kpi} (in Lacs)")
-                            ax.set_xlabel(state_col)
-                            ax.set_ylabel(f"{kpi} (Lacs)")
-                            plt.xticks(rotation=45, ha='right')
-                            st.pyplot(fig)
+                    # Each level lists only the values under the levels chosen above it
+                    filters = {}
+                    for dim in drill_path:
+                        choice = st.sidebar.selectbox(dim, ["All"] + cube.values(dim, filters), key=f"drill_{dim}")
+                        if choice != "All":
+                            filters[dim] = choice
+                    group_by = [dim for dim in drill_path if dim not in filters] or drill_path[-1:]
+                    if filters:
+                        st.caption(" → ".join(f"{dim}: {value}" for dim, value in filters.items()))
+                    with recorder.stage("cube query", view=menu) as stage:
+                        drilled = cube.query(group_by, filters, drill_kpis)
+                        stage["rows"] = len(drilled)
+                    with recorder.stage("table", view=menu, rows=len(drilled)):
+                        formatting.show_table(drilled)
+                    if len(group_by) == 1 and drill_kpis and not drilled.empty:
+                        with recorder.stage("charts", view=menu):
+                            st.bar_chart(drilled.set_index(group_by[0])[drill_kpis[0]])
+            else:
+                aggregates = dimension_aggregates()
+                dim, view_kpis = aggregation.DIMENSION_VIEWS[menu]
+                dim_col = aggregates.dimension_columns.get(dim)
+                if dim_col:
+                    grouped = aggregates.view(dim, view_kpis)
+                    # Numbers stay numeric; commas are applied at render time
+                    with recorder.stage("table", view=menu, rows=len(grouped)):
+                        formatting.show_table(grouped)
+                    # All KPI charts of the view as one cached image
+                    with recorder.stage("charts", view=menu):
+                        charts.show_view(menu, grouped, dim_col, view_kpis)
                 else:
-                    st.warning("No 'State' column found in your data.")
+                    st.warning(f"No '{dim}' column found in your data.")
+
+                # Stored months, answered by indexed queries on the history store
+                if history_periods:
+                    st.subheader(f"{menu} across periods ({period_range[0]} to {period_range[1]})")
+
+                    # Picking another KPI reruns only this section
+                    @st.fragment
+                    def period_comparison():
+                        compare_kpi = st.selectbox("KPI to compare", view_kpis, key=f"compare_{dim}")
+                        trend = history.dimension_by_period(dim, [compare_kpi], *period_range)
+                        if trend.empty:
+                            st.info("No saved workbooks in this period range.")
+                        else:
+                            pivot = trend.pivot(index=dim, columns="period", values=compare_kpi)
+                            formatting.show_table(pivot.reset_index())
+                            st.line_chart(pivot.T)
+
+                    period_comparison()
 
     # Dashboard Summary Tab (if exists)
-    if "Dashboard Summary" in sheet_names:
+    if tab_open("Dashboard Summary"):
         with tabs[sheet_names.index("Dashboard Summary")]:
             st.subheader("Dashboard Summary Data Table")
-            # Try reading with default header
-            df_dash = pd.read_excel(xls, sheet_name="Dashboard Summary")
-            # If empty or only one column, try reading with no header
-            if df_dash.empty or df_dash.shape[1] <= 1:
-                df_dash_raw = pd.read_excel(xls, sheet_name="Dashboard Summary", header=None)
-                # If still empty, show warning
-                if df_dash_raw.empty or df_dash_raw.shape[1] == 0:
-                    st.warning("No data found in Dashboard Summary sheet.")
-                else:
-                    # Format numeric columns with commas
-                    df_dash_fmt = df_dash_raw.copy()
-                    for col in df_dash_fmt.columns:
-                        if pd.api.types.is_numeric_dtype(df_dash_fmt[col]):
-                            df_dash_fmt[col] = df_dash_fmt[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) and str(x).replace('.', '', 1).isdigit() else x)
-                    st.dataframe(df_dash_fmt)
+            # Header mode (first row or none) was sniffed when the upload arrived
+            with recorder.stage("load Dashboard Summary") as stage:
+                df_dash = loader.result("Dashboard Summary")
+                stage["rows"] = len(df_dash)
+            if df_dash.empty or df_dash.shape[1] == 0:
+                st.warning("No data found in Dashboard Summary sheet.")
+                chart_df = None
             else:
-                # Format numeric columns with commas
-                df_dash_fmt = df_dash.copy()
-                for col in df_dash_fmt.columns:
-                    if pd.api.types.is_numeric_dtype(df_dash_fmt[col]):
-                        df_dash_fmt[col] = df_dash_fmt[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) and str(x).replace('.', '', 1).isdigit() else x)
-                st.dataframe(df_dash_fmt)
+                # Numeric columns are shown with commas at render time
+                with recorder.stage("table", view="Dashboard Summary", rows=len(df_dash)):
+                    formatting.show_table(df_dash)
+                chart_df = df_dash
 
-            # Use whichever dataframe has data for charting
-            chart_df = df_dash if not df_dash.empty and df_dash.shape[1] > 1 else (df_dash_raw if 'df_dash_raw' in locals() else None)
             if chart_df is not None and not chart_df.empty and chart_df.shape[1] > 0:
                 # Handle case where months are column headers and metrics are rows
-                metrics = [
-                    "Revenue from Operations (A+B+C)",
-                    "Direct Expenses",
-                    "Indirect Expenses",
-                    "EBITDA"
-                ]
+                metrics = dashboard_summary.KPI_METRICS
                 # Detect if first column is 'Particulars' and months are columns
                 if 'Particulars' in chart_df.columns:
-                    month_cols = [col for col in chart_df.columns if col != 'Particulars']
-                    available_metrics = [m for m in metrics if m in chart_df['Particulars'].values]
-                    if not month_cols:
+                    # Particulars x month matrix as one float64 block, months in date order
+                    with recorder.stage("summary matrix", view="Dashboard Summary", rows=len(chart_df)):
+                        summary = workbook_cache.get_or_compute(
+                            (digest, "dashboard_summary_matrix"),
+                            lambda: dashboard_summary.parse_matrix(chart_df),
+                        )
+                    available_metrics = [m for m in metrics if m in summary]
+                    if not summary.months:
                         st.warning("No month columns found for line chart.")
                     elif not available_metrics:
                         st.warning("None of the required metrics found for line chart: Revenue from Operations (A+B+C), Direct Expenses, Indirect Expenses, EBITDA.")
                     else:
                         st.subheader("Month-wise KPI Bar Graphs")
-                        # Build a dataframe: rows=months, columns=metrics
-                        df_bar = chart_df.set_index('Particulars').loc[available_metrics]
-                        # Convert all values to numeric and to Lacs
-                        df_bar = df_bar.applymap(lambda x: pd.to_numeric(str(x).replace(",", ""), errors='coerce') / 100000 if pd.notnull(x) else x)
-                        df_bar = df_bar.T  # Transpose: now index=months, columns=metrics
-                        if df_bar.empty:
-                            st.warning("No data available to plot month-wise KPI bar graphs.")
-                        else:
-                            for m in available_metrics:
-                                if m in df_bar.columns:
-                                    st.subheader(f"{m} - Month-wise Bar Graph")
-                                    fig, ax = plt.subplots(figsize=(7, 3))
-                                    ax.bar(df_bar.index.astype(str), df_bar[m], color='#1f77b4')
-                                    ax.set_xlabel("Month")
-                                    ax.set_ylabel(f"{m} (Lacs)")
-                                    ax.set_title(f"Month-wise {m}")
-                                    plt.xticks(rotation=45, ha='right')
-                                    st.pyplot(fig)
-                            # Bar chart for 'Net Worth as on' if present
-                            if 'Net Worth as on' in chart_df['Particulars'].values:
-                                net_worth_row = chart_df[chart_df['Particulars'] == 'Net Worth as on']
-                                # Remove 'Particulars' column for plotting
-                                net_worth_vals = net_worth_row.drop('Particulars', axis=1).iloc[0]
-                                # Convert to numeric and to Lacs
-                                net_worth_vals = net_worth_vals.apply(lambda x: pd.to_numeric(str(x).replace(",", ""), errors='coerce') / 100000 if pd.notnull(x) else x)
-                                st.subheader("Net Worth as on - Month-wise Bar Chart")
-                                fig, ax = plt.subplots(figsize=(7, 3))
-                                ax.bar(net_worth_vals.index.astype(str), net_worth_vals.values, color='#2ca02c')
-                                ax.set_xlabel("Month")
-                                ax.set_ylabel("Net Worth (Lacs)")
-                                ax.set_title("Month-wise Net Worth as on")
-                                plt.xticks(rotation=45, ha='right')
-                                st.pyplot(fig)
-                        # ...existing code...
+                        # Values in Lacs: rows=metrics, columns=months
+                        lacs = summary.rows(available_metrics) / formatting.LAC
+                        # One cached figure with a bar graph per metric
+                        with recorder.stage("charts", view="Dashboard Summary"):
+                            charts.show_bars("Dashboard Summary KPIs", [
+                                charts.month_bar_panel(f"Month-wise {m}", summary.month_labels, values, f"{m} (Lacs)")
+                                for m, values in zip(available_metrics, lacs)
+                            ])
+                        # Bar chart for 'Net Worth as on' if present
+                        if dashboard_summary.NET_WORTH in summary:
+                            st.subheader("Net Worth as on - Month-wise Bar Chart")
+                            charts.show_bars("Dashboard Summary Net Worth", [
+                                charts.month_bar_panel("Month-wise Net Worth as on", summary.month_labels,
+                                                       summary.row(dashboard_summary.NET_WORTH) / formatting.LAC,
+                                                       "Net Worth (Lacs)", color='#2ca02c')
+                            ])
+                        st.subheader("Derived Metrics")
+                        st.caption("EBITDA margin and month-on-month growth in %, trailing 3-month sums in Lacs.")
+                        with recorder.stage("derived metrics", view="Dashboard Summary"):
+                            derived = summary.derived_frame(available_metrics, window=3, scale=formatting.LAC)
+                            st.dataframe(derived, column_config={
+                                col: st.column_config.NumberColumn(col, format="%.2f") for col in derived.columns
+                            })
                 else:
                     # Fallback to previous logic if 'Month' column exists
-                    month_col = None
-                    for col in chart_df.columns:
-                        col_clean = str(col).strip().lower().replace(' ', '')
-                        if col_clean.startswith('month') or 'month' in col_clean:
-                            month_col = col
-                            break
+                    month_col = dashboard_summary.find_month_column(chart_df.columns)
                     available_metrics = [m for m in metrics if m in chart_df.columns]
                     if not month_col:
                         st.warning("No month column found for line chart. Please ensure a column named 'Month' exists.")
@@ -414,41 +404,52 @@ if uploaded_file is not None:
                         st.warning("None of the required metrics found for line chart: Revenue from Operations (A+B+C), Direct Expenses, Indirect Expenses, EBITDA.")
                     else:
                         st.subheader("Month-wise KPI Bar Graphs")
-                        # Convert metrics to numeric and to Lacs if needed
-                        for m in available_metrics:
-                            chart_df[m] = pd.to_numeric(chart_df[m].astype(str).str.replace(",", ""), errors='coerce') / 100000
-                        month_data = chart_df.groupby(month_col)[available_metrics].sum().sort_index()
+                        # Metric sums per month in Lacs, in chronological order
+                        month_data = dashboard_summary.month_totals(chart_df, month_col, available_metrics) / formatting.LAC
                         if month_data.empty:
                             st.warning("No data available to plot month-wise KPI bar graphs.")
                         else:
-                            for m in available_metrics:
-                                st.subheader(f"{m} - Month-wise Bar Graph")
-                                fig, ax = plt.subplots(figsize=(7, 3))
-                                ax.bar(month_data.index.astype(str), month_data[m], color='#1f77b4')
-                                ax.set_xlabel("Month")
-                                ax.set_ylabel(f"{m} (Lacs)")
-                                ax.set_title(f"Month-wise {m}")
-                                plt.xticks(rotation=45, ha='right')
-                                st.pyplot(fig)
+                            charts.show_bars("Dashboard Summary KPIs", [
+                                charts.month_bar_panel(f"Month-wise {m}", month_data.index, month_data[m], f"{m} (Lacs)")
+                                for m in available_metrics
+                            ])
 
     # P&L Summary Tab (if exists)
-    if "P&L Summary" in sheet_names:
+    if tab_open("P&L Summary"):
         with tabs[sheet_names.index("P&L Summary")]:
             st.subheader("P&L Summary Data Table")
             try:
-                df_pl = pd.read_excel(xls, sheet_name="P&L Summary")
-                # Drop rows where all columns are empty or NaN
-                df_pl = df_pl.dropna(how='all')
-                # Format numeric columns with commas for readability
-                df_pl_fmt = df_pl.copy()
-                for col in df_pl_fmt.columns:
-                    if pd.api.types.is_numeric_dtype(df_pl_fmt[col]):
-                        df_pl_fmt[col] = df_pl_fmt[col].apply(lambda x: f"{int(x):,}" if pd.notnull(x) and str(x).replace('.', '', 1).isdigit() else x)
-                st.dataframe(df_pl_fmt)
+                with recorder.stage("load P&L Summary") as stage:
+                    df_pl = loader.result("P&L Summary")
+                    # Drop rows where all columns are empty or NaN
+                    df_pl = df_pl.dropna(how='all')
+                    stage["rows"] = len(df_pl)
+                # Numeric columns are shown with commas at render time
+                with recorder.stage("table", view="P&L Summary", rows=len(df_pl)):
+                    formatting.show_table(df_pl)
+                pl_periods = history.periods()
+                if pl_periods:
+                    pl_range = comparison_range(pl_periods)
+                    st.subheader(f"P&L Summary across saved periods ({pl_range[0]} to {pl_range[1]})")
+                    pl_history = history.pl_by_period(*pl_range)
+
+                    # Picking another column reruns only this section
+                    @st.fragment
+                    def pl_comparison():
+                        pl_col = st.selectbox("P&L column", list(dict.fromkeys(pl_history["col"])), key="pl_col")
+                        pl_pivot = pl_history[pl_history["col"] == pl_col].pivot_table(
+                            index=["line", "particulars"], columns="period", values="value", aggfunc="sum"
+                        ).reset_index(level="line", drop=True)
+                        formatting.show_table(pl_pivot.reset_index())
+
+                    if not pl_history.empty:
+                        pl_comparison()
             except Exception as e:
                 st.warning(f"Could not read P&L Summary sheet: {e}")
 
-if 'Nunito' in [f.name for f in fm.fontManager.ttflist]:
-    plt.rcParams['font.family'] = 'Nunito'
-else:
-    plt.rcParams['font.family'] = 'sans-serif'
+if recorder.enabled:
+    run_records = recorder.finish()
+    profile_log = st.session_state.setdefault("diagnostics_records", [])
+    profile_log.extend(run_records)
+    del profile_log[:-instrumentation.SESSION_RECORDS]
+    instrumentation.show_panel(run_records, profile_log, workbook_cache.stats())
@@ -0,0 +1,186 @@
+"""Month-wise financial pipeline for the "Dashboard Summary" sheet.
+
+The sheet is a Particulars x month matrix whose cells may be numbers or
+"1,234,567"-style strings. It is parsed into one float64 block in a single
+vectorized step, month headers are normalized to monthly periods so they sort
+chronologically, and derived metrics (margins, MoM growth, trailing sums) are
+computed with array operations over every metric at once.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+LABEL_COLUMN = "Particulars"
+REVENUE = "Revenue from Operations (A+B+C)"
+EBITDA = "EBITDA"
+NET_WORTH = "Net Worth as on"
+# Metrics drawn as month-wise bar graphs
+KPI_METRICS = [REVENUE, "Direct Expenses", "Indirect Expenses", EBITDA]
+
+# Tried in order; the first format that parses a header wins
+# (explicit formats only: a free-form parse would read "2024" or "Total 24" as a month)
+MONTH_FORMATS = [
+    "%b-%y", "%b %y", "%b'%y", "%b-%Y", "%b %Y", "%B-%y", "%B %y", "%B-%Y", "%B %Y",
+    "%Y-%m", "%m/%Y", "%m-%Y", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S",
+]
+
+
+def normalize_months(headers):
+    """Monthly ``PeriodIndex`` for month headers; unparseable headers become NaT."""
+    headers = list(headers)
+    parsed = pd.Series(pd.NaT, index=range(len(headers)), dtype="datetime64[ns]")
+    text = pd.Series([str(h).strip() for h in headers])
+    for i, header in enumerate(headers):
+        if isinstance(header, (datetime.date, datetime.datetime, pd.Timestamp)):
+            parsed[i] = pd.Timestamp(header)
+    for fmt in MONTH_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors="coerce")
+    return pd.PeriodIndex(parsed, freq="M")
+
+
+def period_order(headers):
+    """Positions that sort ``headers`` chronologically; unparseable ones keep their order at the end."""
+    periods = normalize_months(headers)
+    keys = np.where(periods.isna(), np.iinfo(np.int64).max, periods.asi8)
+    return np.argsort(keys, kind="stable")
+
+
+def parse_numeric_block(block):
+    """Convert a DataFrame of numbers and comma strings to a float64 ndarray."""
+    raw = block.to_numpy(dtype=object).ravel()
+    flat = pd.Series(raw)
+    numeric = pd.to_numeric(flat, errors="coerce")
+    # Only cells that are not already numbers go through the string path
+    needs_text = numeric.isna() & flat.notna()
+    if needs_text.any():
+        text = flat[needs_text].astype(str).str.replace(",", "", regex=False).str.strip()
+        numeric[needs_text] = pd.to_numeric(text, errors="coerce")
+    return numeric.to_numpy(dtype=np.float64).reshape(block.shape)
+
+
+class SummaryMatrix:
+    """Metrics (rows) x months (columns, chronological) as one float64 block."""
+
+    def __init__(self, metrics, months, periods, values):
+        self.metrics = list(metrics)
+        self.months = list(months)
+        self.periods = periods
+        self.values = values
+        self._index = {metric: i for i, metric in reversed(list(enumerate(self.metrics)))}
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def __contains__(self, metric):
+        return metric in self._index
+
+    @property
+    def month_labels(self):
+        return [str(m) if pd.isna(p) else p.strftime("%b-%y") for m, p in zip(self.months, self.periods)]
+
+    def rows(self, metrics):
+        return self.values[[self._index[m] for m in metrics]]
+
+    def row(self, metric):
+        return self.values[self._index[metric]]
+
+    @property
+    def dated(self):
+        """Mask of the columns whose header parsed as a month ("Total", "YTD" do not)."""
+        return ~np.asarray(pd.isna(self.periods), dtype=bool)
+
+    def frame(self, metrics=None, values=None, dated_only=False):
+        metrics = self.metrics if metrics is None else metrics
+        values = self.rows(metrics) if values is None else values
+        labels = self.month_labels
+        if dated_only:
+            labels = [label for label, dated in zip(labels, self.dated) if dated]
+        return pd.DataFrame(values, index=pd.Index(metrics, name=LABEL_COLUMN), columns=labels)
+
+    def mom_growth(self):
+        """Month-on-month growth (%) for every metric over the dated columns; the first month is NaN."""
+        values = self.values[:, self.dated]
+        growth = np.full_like(values, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth[:, 1:] = (values[:, 1:] / values[:, :-1] - 1) * 100
+        growth[~np.isfinite(growth)] = np.nan
+        return growth
+
+    def trailing(self, window=3):
+        """Trailing ``window``-month sums over the dated columns; NaN until a full window of data."""
+        values = self.values[:, self.dated]
+        filled = np.nan_to_num(values)
+        sums = np.cumsum(filled, axis=1)
+        counts = np.cumsum(~np.isnan(values), axis=1)
+        out = np.full_like(values, np.nan)
+        if values.shape[1] >= window:
+            lead_sums = np.concatenate([np.zeros((len(sums), 1)), sums[:, :-window]], axis=1)
+            lead_counts = np.concatenate([np.zeros((len(counts), 1), dtype=counts.dtype), counts[:, :-window]], axis=1)
+            full = (counts[:, window - 1:] - lead_counts) == window
+            out[:, window - 1:] = np.where(full, sums[:, window - 1:] - lead_sums, np.nan)
+        return out
+
+    def ratio(self, numerator, denominator):
+        """``numerator`` / ``denominator`` per dated column."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = self.row(numerator)[self.dated] / self.row(denominator)[self.dated]
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+    def ebitda_margin(self):
+        """EBITDA as a percentage of Revenue from Operations, per month."""
+        if EBITDA not in self or REVENUE not in self:
+            return None
+        return self.ratio(EBITDA, REVENUE) * 100
+
+    def derived_frame(self, metrics, window=3, scale=1):
+        """Derived metrics table: EBITDA margin, MoM growth and trailing sums of ``metrics``.
+
+        Only columns whose header parsed as a month are included.
+        """
+        names, rows = [], []
+        margin = self.ebitda_margin()
+        if margin is not None:
+            names.append("EBITDA Margin (%)")
+            rows.append(margin)
+        positions = [self._index[m] for m in metrics]
+        growth = self.mom_growth()[positions]
+        trailing = self.trailing(window)[positions] / scale
+        names += [f"{m} MoM Growth (%)" for m in metrics]
+        names += [f"{m} Trailing {window}M" for m in metrics]
+        rows += list(growth) + list(trailing)
+        if not rows or not self.dated.any():
+            return pd.DataFrame()
+        return self.frame(names, np.vstack(rows), dated_only=True)
+
+
+def find_month_column(columns):
+    """First column whose name contains "month" (case and spaces ignored), if any."""
+    for col in columns:
+        if "month" in str(col).strip().lower().replace(" ", ""):
+            return col
+    return None
+
+
+def month_totals(df, month_col, metrics):
+    """Sums of ``metrics`` per value of ``month_col`` (one row per month), in date order when the months parse."""
+    values = pd.DataFrame(parse_numeric_block(df[metrics]), columns=metrics, index=df.index)
+    totals = values.groupby(df[month_col]).sum()
+    return totals.iloc[period_order(totals.index)]
+
+
+def parse_matrix(df, label_column=LABEL_COLUMN):
+    """Build a ``SummaryMatrix`` from a Particulars x month sheet."""
+    month_cols = [col for col in df.columns if col != label_column]
+    order = period_order(month_cols)
+    month_cols = [month_cols[i] for i in order]
+    labels = df[label_column]
+    keep = labels.notna().to_numpy()
+    metrics = labels[keep].astype(str).str.strip()
+    values = parse_numeric_block(df.loc[keep, month_cols]) if month_cols else np.empty((int(keep.sum()), 0))
+    return SummaryMatrix(metrics, month_cols, normalize_months(month_cols), values)
@@ -0,0 +1,405 @@
+"""Headless export of the dashboard views to static HTML/PDF report packs.
+
+    python export_report.py WORKBOOK_DIR [--output reports] [--format html,pdf] [--workers N] [--force]
+
+Every ``*.xlsx`` in ``WORKBOOK_DIR`` gets ``<output>/<workbook>-<hash>/`` holding a
+PNG and an HTML table per view plus ``report.html`` (self-contained) and
+``report.pdf``. The views are the dashboard's: KPI totals and every
+Profitability dimension view, the Dashboard Summary table, month-wise graphs
+and derived metrics, and the P&L Summary table. They are built with the same
+schema, aggregation and chart code as the Streamlit app.
+
+Work runs on a process pool in three phases: parse and aggregate (one task
+per workbook), render charts and tables (one task per view), then assemble
+the PDFs. ``manifest.json`` in the output directory records each workbook's
+content hash and a hash of every view's inputs. Unchanged workbooks are
+skipped without being parsed, and in a changed workbook only views whose
+inputs changed are re-rendered.
+"""
+import argparse
+import base64
+import hashlib
+import html
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import aggregation
+import charts
+import dashboard_summary
+import formatting
+import schema
+import sheet_loader
+import snapshot
+import streaming
+import workbook_cache
+
+# Bump when the report layout changes so every view is rendered again
+EXPORT_VERSION = 1
+MANIFEST = "manifest.json"
+FORMATS = ("html", "pdf")
+# Rows of each table printed in the PDF; the HTML report has them all
+PDF_TABLE_ROWS = 30
+PDF_PAGE_SIZE = (11.69, 8.27)  # A4 landscape (inches)
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-") or "view"
+
+
+def output_name(filename):
+    """Output folder for a workbook: its slug plus a hash of the exact file name,
+    so "Apr 24.xlsx" and "apr_24.xlsx" do not share a folder."""
+    return f"{slugify(Path(filename).stem)}-{hashlib.sha1(filename.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _view(section, title, table=None, panels=None, kind="bar", ncols=2, caption=None, number_format="{:,.0f}"):
+    return {
+        "slug": slugify(title),
+        "section": section,
+        "title": title,
+        "table": table,
+        "panels": panels or None,
+        "kind": kind,
+        "ncols": ncols,
+        "caption": caption,
+        "number_format": number_format,
+    }
+
+
+def view_hash(view):
+    """Hash of everything a rendered view depends on."""
+    h = hashlib.sha1(repr((EXPORT_VERSION, view["slug"], view["title"], view["caption"], view["number_format"])).encode())
+    table = view["table"]
+    if table is not None:
+        h.update(repr([str(col) for col in table.columns]).encode())
+        h.update(pd.util.hash_pandas_object(table.astype(str), index=True).to_numpy().tobytes())
+    if view["panels"]:
+        h.update(repr(charts.chart_key(view["slug"], view["panels"], view["kind"], view["ncols"])).encode())
+    return h.hexdigest()
+
+
+def profitability_views(data, df=None):
+    """KPI totals and one view per dimension, from a parsed sheet or (``df=None``) by streaming."""
+    if df is None:
+        streamed = streaming.stream_sheet(data, "Profitability")
+        aggregates, column_map, totals = streamed.aggregator, streamed.column_map, streamed.totals.sums
+        issues = streamed.issues
+    else:
+        prepared = schema.prepare(df)
+        column_map, issues = prepared.column_map, prepared.issues
+        aggregates = aggregation.aggregate_dimensions(prepared.frame, column_map.dimensions, column_map.kpi_names)
+        totals = aggregation.RunningTotals(column_map.kpi_names).add(prepared.frame).sums
+
+    views = [_view(
+        "Profitability", "KPI Cards",
+        table=pd.DataFrame({"KPI": list(totals), "Total": list(totals.values())}),
+        caption=" ".join(issues) or None,
+    )]
+    for menu, (dim, kpis) in aggregation.DIMENSION_VIEWS.items():
+        dim_col = aggregates.dimension_columns.get(dim)
+        if not dim_col:
+            continue
+        grouped = aggregates.view(dim, kpis)
+        views.append(_view(
+            "Profitability", menu,
+            table=grouped,
+            panels=charts.view_panels(menu, grouped, dim_col, kpis),
+            kind=charts.VIEW_STYLES[menu]["kind"],
+        ))
+    return views
+
+
+def summary_views(df):
+    section = "Dashboard Summary"
+    if df.empty or df.shape[1] == 0:
+        return []
+    views = [_view(section, "Dashboard Summary Data Table", table=df)]
+    if dashboard_summary.LABEL_COLUMN in df.columns:
+        summary = dashboard_summary.parse_matrix(df)
+        metrics = [m for m in dashboard_summary.KPI_METRICS if m in summary]
+        if not summary.months or not metrics:
+            return views
+        lacs = summary.rows(metrics) / formatting.LAC
+        views.append(_view(section, "Month-wise KPI Bar Graphs", ncols=1, panels=[
+            charts.month_bar_panel(f"Month-wise {m}", summary.month_labels, values, f"{m} (Lacs)")
+            for m, values in zip(metrics, lacs)
+        ]))
+        if dashboard_summary.NET_WORTH in summary:
+            views.append(_view(section, "Net Worth as on - Month-wise Bar Chart", ncols=1, panels=[
+                charts.month_bar_panel("Month-wise Net Worth as on", summary.month_labels,
+                                       summary.row(dashboard_summary.NET_WORTH) / formatting.LAC,
+                                       "Net Worth (Lacs)", color="#2ca02c"),
+            ]))
+        views.append(_view(
+            section, "Derived Metrics",
+            table=summary.derived_frame(metrics, window=3, scale=formatting.LAC),
+            caption="EBITDA margin and month-on-month growth in %, trailing 3-month sums in Lacs.",
+            number_format="{:,.2f}",
+        ))
+    else:
+        month_col = dashboard_summary.find_month_column(df.columns)
+        metrics = [m for m in dashboard_summary.KPI_METRICS if m in df.columns]
+        if month_col is None or not metrics:
+            return views
+        month_data = dashboard_summary.month_totals(df, month_col, metrics) / formatting.LAC
+        if not month_data.empty:
+            views.append(_view(section, "Month-wise KPI Bar Graphs", ncols=1, panels=[
+                charts.month_bar_panel(f"Month-wise {m}", month_data.index, month_data[m], f"{m} (Lacs)")
+                for m in metrics
+            ]))
+    return views
+
+
+def build_views(path):
+    """Parse one workbook and describe its views (runs in a worker process)."""
+    data = Path(path).read_bytes()
+    digest = workbook_cache.content_hash(data)
+    _, headers = sheet_loader.sniff_headers(data)
+
+    def load(sheet):
+        return snapshot.load_sheet(data, sheet, headers[sheet], digest)
+
+    views = []
+    if "Profitability" in headers:
+        # Same default as the dashboard: large workbooks are streamed
+        large = len(data) > streaming.THRESHOLD_BYTES
+        views += profitability_views(data, None if large else load("Profitability"))
+    if "Dashboard Summary" in headers:
+        views += summary_views(load("Dashboard Summary"))
+    if "P&L Summary" in headers:
+        views.append(_view("P&L Summary", "P&L Summary Data Table", table=load("P&L Summary").dropna(how="all")))
+    for view in views:
+        view["hash"] = view_hash(view)
+    return digest, views
+
+
+def table_html(table, number_format="{:,.0f}"):
+    numeric = [col for col in table.columns
+               if pd.api.types.is_numeric_dtype(table[col]) and not pd.api.types.is_bool_dtype(table[col])]
+    formatters = {col: (lambda v, fmt=number_format: "" if pd.isna(v) else fmt.format(v)) for col in numeric}
+    show_index = table.index.name is not None
+    return table.to_html(index=show_index, formatters=formatters, na_rep="", border=0, classes="data")
+
+
+def _view_files(out_dir, view):
+    files = []
+    if view["panels"]:
+        files.append(out_dir / f"{view['slug']}.png")
+    if view["table"] is not None:
+        files.append(out_dir / f"{view['slug']}.html")
+    return files
+
+
+def render_view(view, out_dir):
+    """Write a view's chart PNG and table HTML (runs in a worker process)."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if view["panels"]:
+        png = charts.render_panels(view["panels"], view["kind"], view["ncols"])
+        (out_dir / f"{view['slug']}.png").write_bytes(png)
+    if view["table"] is not None:
+        (out_dir / f"{view['slug']}.html").write_text(table_html(view["table"], view["number_format"]), encoding="utf-8")
+    return view["slug"]
+
+
+def write_html_report(title, views, out_dir):
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>",
+        f"<title>{html.escape(title)}</title>",
+        "<style>body{font-family:Nunito,sans-serif;font-size:12px;margin:24px}"
+        "table.data{border-collapse:collapse;margin-bottom:24px}"
+        "table.data td,table.data th{border:1px solid #ddd;padding:4px 8px}"
+        "table.data td{text-align:right}img{max-width:100%}</style></head><body>",
+        f"<h1>{html.escape(title)}</h1>",
+    ]
+    section = None
+    for view in views:
+        if view["section"] != section:
+            section = view["section"]
+            parts.append(f"<h2>{html.escape(section)}</h2>")
+        parts.append(f"<h3>{html.escape(view['title'])}</h3>")
+        if view["caption"]:
+            parts.append(f"<p>{html.escape(view['caption'])}</p>")
+        for path in _view_files(out_dir, view):
+            if path.suffix == ".png":
+                encoded = base64.b64encode(path.read_bytes()).decode("ascii")
+                parts.append(f"<img alt='{html.escape(view['title'])}' src='data:image/png;base64,{encoded}'>")
+            else:
+                parts.append(path.read_text(encoding="utf-8"))
+    parts.append("</body></html>")
+    (out_dir / "report.html").write_text("\n".join(parts), encoding="utf-8")
+
+
+def write_pdf_report(title, views, out_dir):
+    """One page per view: its chart and the first ``PDF_TABLE_ROWS`` table rows (runs in a worker process)."""
+    charts.load_matplotlib()
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from matplotlib.image import imread
+
+    with PdfPages(out_dir / "report.pdf") as pdf:
+        for view in views:
+            fig = Figure(figsize=PDF_PAGE_SIZE)
+            fig.suptitle(f"{title} - {view['section']}: {view['title']}", fontsize=12)
+            png = out_dir / f"{view['slug']}.png"
+            table = view["table"]
+            has_chart = bool(view["panels"]) and png.exists()
+            if has_chart:
+                ax = fig.add_axes([0.03, 0.35 if table is not None else 0.03, 0.94, 0.6 if table is not None else 0.9])
+                ax.imshow(imread(png))
+                ax.set_axis_off()
+            if table is not None:
+                ax = fig.add_axes([0.03, 0.03, 0.94, 0.3 if has_chart else 0.9])
+                ax.set_axis_off()
+                _draw_table(ax, table, view["number_format"])
+            pdf.savefig(fig)
+            fig.clear()
+    return out_dir / "report.pdf"
+
+
+def _draw_table(ax, table, number_format):
+    shown = table.head(PDF_TABLE_ROWS)
+    if table.index.name is not None:
+        shown = shown.reset_index()
+    if shown.empty or shown.shape[1] == 0:
+        ax.text(0.5, 0.5, "No rows", ha="center", va="center")
+        return
+    cells = [
+        [("" if pd.isna(v) else number_format.format(v)) if isinstance(v, (int, float)) and not isinstance(v, bool)
+         else ("" if v is None or (isinstance(v, float) and pd.isna(v)) else str(v)) for v in row]
+        for row in shown.itertuples(index=False, name=None)
+    ]
+    labels = [str(col) for col in shown.columns]
+    # Stretched to the page width, columns as wide as their longest text
+    widths = [max(len(text) for text in [label] + [row[i] for row in cells]) + 2 for i, label in enumerate(labels)]
+    widths = [w / sum(widths) for w in widths]
+    truncated = len(table) > PDF_TABLE_ROWS
+    height = min(0.94 if truncated else 1.0, (len(cells) + 1) * 0.06)
+    drawn = ax.table(cellText=cells, colLabels=labels, colWidths=widths, bbox=[0, 1 - height, 1, height])
+    drawn.auto_set_font_size(False)
+    drawn.set_fontsize(7 if shown.shape[1] <= 8 else 5)
+    if truncated:
+        ax.text(0.5, 0.0, f"First {PDF_TABLE_ROWS} of {len(table):,} rows; see report.html for the full table.",
+                ha="center", va="bottom", fontsize=7, transform=ax.transAxes)
+
+
+def load_manifest(path):
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": EXPORT_VERSION, "workbooks": {}}
+    if manifest.get("version") != EXPORT_VERSION:
+        return {"version": EXPORT_VERSION, "workbooks": {}}
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _up_to_date(entry, digest, out_dir, formats):
+    if not entry or entry.get("digest") != digest or not set(formats) <= set(entry.get("formats", [])):
+        return False
+    return all((out_dir / name).exists() for name in entry.get("files", [])) and all(
+        (out_dir / f"report.{fmt}").exists() for fmt in formats
+    )
+
+
+def export_directory(directory, output, formats=FORMATS, workers=None, force=False):
+    """Export every workbook in ``directory``; returns {workbook name: status}."""
+    directory, output = Path(directory), Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / MANIFEST
+    manifest = load_manifest(manifest_path)
+    entries = manifest["workbooks"]
+
+    pending, status = {}, {}
+    for path in sorted(directory.glob("*.xlsx")):
+        if path.name.startswith("~$"):  # Excel lock files
+            continue
+        digest = workbook_cache.content_hash(path.read_bytes())
+        if not force and _up_to_date(entries.get(path.name), digest, output / output_name(path.name), formats):
+            status[path.name] = "unchanged"
+        else:
+            pending[path.name] = path
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        built = {name: pool.submit(build_views, path) for name, path in pending.items()}
+        renders, results = [], {}
+        for name, future in built.items():
+            try:
+                digest, views = future.result()
+            except Exception as exc:  # one bad workbook must not stop the batch
+                status[name] = f"failed: {exc}"
+                continue
+            out_dir = output / output_name(name)
+            previous = {} if force else (entries.get(name) or {}).get("views", {})
+            stale = [
+                view for view in views
+                if previous.get(view["slug"]) != view["hash"] or not all(p.exists() for p in _view_files(out_dir, view))
+            ]
+            renders += [pool.submit(render_view, view, out_dir) for view in stale]
+            results[name] = (digest, views, out_dir, len(stale))
+        for future in renders:
+            future.result()
+
+        pdfs = {}
+        for name, (digest, views, out_dir, rendered) in results.items():
+            # Tables and charts are not needed to assemble the reports
+            title = Path(name).stem
+            if "html" in formats:
+                write_html_report(title, views, out_dir)
+            if "pdf" in formats:
+                light = [{**view, "panels": bool(view["panels"])} for view in views]
+                pdfs[name] = pool.submit(write_pdf_report, title, light, out_dir)
+            entries[name] = {
+                "digest": digest,
+                "formats": sorted(formats),
+                "views": {view["slug"]: view["hash"] for view in views},
+                "files": sorted(p.name for view in views for p in _view_files(out_dir, view)),
+            }
+            status[name] = f"{rendered} of {len(views)} views rendered"
+        for name, future in pdfs.items():
+            try:
+                future.result()
+            except Exception as exc:
+                status[name] = f"failed: PDF: {exc}"
+                entries.pop(name, None)
+
+    save_manifest(manifest_path, manifest)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the dashboard views of every workbook in a directory.")
+    parser.add_argument("directory", help="directory of .xlsx workbooks")
+    parser.add_argument("--output", default="reports", help="output directory (default: reports)")
+    parser.add_argument("--format", default=",".join(FORMATS), help="comma-separated: html, pdf (default: both)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="render every view even if unchanged")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    unknown = set(formats) - set(FORMATS)
+    if unknown or not formats:
+        parser.error(f"--format must be html and/or pdf, got {args.format!r}")
+    if not Path(args.directory).is_dir():
+        parser.error(f"not a directory: {args.directory}")
+
+    status = export_directory(args.directory, args.output, formats, args.workers, args.force)
+    for name, result in status.items():
+        print(f"{name}: {result}")
+    if not status:
+        print(f"No .xlsx workbooks in {args.directory}")
+    return 1 if any(result.startswith("failed") for result in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""Render-time number formatting for dashboard tables and charts.
+
+Data stays numeric end to end; thousands separators are applied by the
+dataframe column config in the browser and Lacs scaling is a vectorized
+division, so no view turns numbers into strings and back.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+LAC = 100000
+THOUSANDS_FORMAT = "%,d"
+
+
+def thousands_config(df, columns=None):
+    """``column_config`` showing numeric columns with thousands separators."""
+    if columns is None:
+        columns = [col for col in df.columns if pd.api.types.is_numeric_dtype(df[col])]
+    # Keyed by name as a string: int keys would be read as column positions
+    return {
+        str(col): st.column_config.NumberColumn(str(col), format=THOUSANDS_FORMAT)
+        for col in columns
+        if col in df.columns and not pd.api.types.is_bool_dtype(df[col])
+    }
+
+
+def show_table(df, columns=None):
+    st.dataframe(df, column_config=thousands_config(df, columns))
+
+
+def to_lacs(values):
+    return np.asarray(values, dtype=np.float64) / LAC
+
+
+def parse_numeric(values):
+    """Vectorized ``pd.to_numeric`` that tolerates "1,234,567"-style strings.
+
+    Accepts a Series or a DataFrame (converted column by column); values that
+    cannot be parsed become NaN.
+    """
+    if isinstance(values, pd.DataFrame):
+        return values.apply(parse_numeric)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(np.float64)
+    text = values.astype(str).str.replace(",", "", regex=False).str.strip()
+    return pd.to_numeric(text, errors="coerce")
+
+
+def format_thousands(value):
+    if value is None or pd.isna(value):
+        return "N/A"
+    return f"{value:,.0f}" if isinstance(value, float) else f"{value:,}"
+
+
+def kpi_card_html(label, value):
+    return f"""
+        <div style='border:2px solid #1f77b4; border-radius:8px; padding:16px; min-width:180px; margin-bottom:8px; background:#f9f9f9;'>
+            <div style='font-size:16px; font-weight:bold;'>{label}</div>
+            <div style='font-size:20px; color:#1f77b4; font-weight:bold;'>{format_thousands(value)}</div>
+        </div>
+    """
@@ -0,0 +1,191 @@
+"""Ingest-once SQLite store of historical workbooks for multi-period comparison.
+
+Each saved workbook is tagged with its period (YYYY-MM). The Profitability
+sheet is stored at its finest dimension grain: one row per distinct
+combination of Product/Zone/BD/AM/Segment/State with the KPI sums and the
+source row count. It is indexed on period plus each dimension. P&L Summary is
+stored in long form (Particulars x column). Period-range comparisons are then
+answered by indexed SQL queries without re-parsing any workbook.
+"""
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import dashboard_summary
+import formatting
+
+DB_PATH = Path(os.environ.get(
+    "CXO_HISTORY_DB",
+    Path.home() / ".cache" / "cxo_dashboard" / "history.sqlite3",
+))
+
+# Logical dimension / KPI -> SQL column
+DIMENSION_COLUMNS = {dim: dim.lower() for dim in aggregation.DIMENSIONS}
+KPI_COLUMNS = {kpi: re.sub(r"[^a-z0-9]+", "_", kpi.lower()).strip("_") for kpi in aggregation.KPI_COLUMNS}
+
+
+def period_key(value):
+    """'YYYY-MM' for a date, Timestamp or month header such as 'Apr-24'."""
+    if isinstance(value, str):
+        period = dashboard_summary.normalize_months([value])[0]
+        return None if pd.isna(period) else str(period)
+    return str(pd.Period(value, freq="M"))
+
+
+def guess_period(filename):
+    """Period named in a workbook file name (e.g. 'Profitability Apr-24.xlsx'), if any."""
+    stem = Path(filename).stem
+    tokens = re.findall(r"\d{4}[-_]\d{2}", stem) + re.findall(r"[A-Za-z]{3,9}[-_ ']?\d{2,4}", stem)
+    for token in tokens:
+        key = period_key(token.replace("_", "-"))
+        if key:
+            return key
+    return None
+
+
+class HistoryStore:
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self._write_lock = threading.Lock()
+        self._ensure_schema()
+
+    @contextmanager
+    def _connect(self):
+        # One connection per call: sqlite3 connections are not shared across threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        dims = ", ".join(f"{col} TEXT" for col in DIMENSION_COLUMNS.values())
+        kpis = ", ".join(f"{col} REAL" for col in KPI_COLUMNS.values())
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workbooks ("
+                "digest TEXT PRIMARY KEY, period TEXT NOT NULL, source TEXT, ingested_at TEXT)"
+            )
+            conn.execute(f"CREATE TABLE IF NOT EXISTS profitability (period TEXT NOT NULL, {dims}, {kpis}, row_count INTEGER)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pl_summary ("
+                "period TEXT NOT NULL, line INTEGER, particulars TEXT, col TEXT, value REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_workbooks_period ON workbooks (period)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_profitability_period ON profitability (period)")
+            for col in DIMENSION_COLUMNS.values():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_profitability_period_{col} ON profitability (period, {col})")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_pl_summary_period ON pl_summary (period, particulars)")
+
+    def contains(self, digest):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM workbooks WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def source(self, period):
+        """File name of the workbook stored for ``period``, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT source FROM workbooks WHERE period = ?", (period,)).fetchone()
+        return None if row is None else row[0]
+
+    def periods(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT period FROM workbooks ORDER BY period")]
+
+    def ingest(self, digest, period, source, aggregator, pl_frame=None, replace=False):
+        """Store one workbook under ``period``.
+
+        Returns False if this exact workbook (by content hash) is already
+        stored. A different workbook already stored for ``period`` raises
+        ``ValueError`` unless ``replace`` is set, in which case it is replaced.
+        """
+        if self.contains(digest):
+            return False
+        if not replace and self.source(period) is not None:
+            raise ValueError(f"{period} already holds {self.source(period)!r}")
+        base = aggregator.base_table()
+        dims = [dim for dim in DIMENSION_COLUMNS if dim in base.columns]
+        kpis = [kpi for kpi in KPI_COLUMNS if kpi in base.columns]
+        columns = ["period"] + [DIMENSION_COLUMNS[d] for d in dims] + [KPI_COLUMNS[k] for k in kpis] + ["row_count"]
+        records = base[dims + kpis + ["Rows"]].astype(object).where(base[dims + kpis + ["Rows"]].notna(), None)
+        for dim in dims:
+            records[dim] = records[dim].map(lambda v: None if v is None else str(v))
+        rows = [(period, *row) for row in records.itertuples(index=False, name=None)]
+
+        with self._write_lock, self._connect() as conn:
+            for table in ("profitability", "pl_summary", "workbooks"):
+                conn.execute(f"DELETE FROM {table} WHERE period = ?", (period,))
+            conn.executemany(
+                f"INSERT INTO profitability ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows,
+            )
+            if pl_frame is not None and not pl_frame.empty:
+                conn.executemany(
+                    "INSERT INTO pl_summary (period, line, particulars, col, value) VALUES (?, ?, ?, ?, ?)",
+                    _pl_records(period, pl_frame),
+                )
+            conn.execute(
+                "INSERT INTO workbooks (digest, period, source, ingested_at) VALUES (?, ?, ?, ?)",
+                (digest, period, source, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+        return True
+
+    def dimension_by_period(self, dim, kpis, start, end):
+        """KPI sums per (period, dimension value) for periods in [start, end]."""
+        col = DIMENSION_COLUMNS[dim]
+        sums = ", ".join(f"SUM({KPI_COLUMNS[k]}) AS \"{k}\"" for k in kpis)
+        query = (
+            f"SELECT period, {col} AS \"{dim}\", {sums} FROM profitability "
+            f"WHERE period BETWEEN ? AND ? AND {col} IS NOT NULL GROUP BY period, {col} ORDER BY period, {col}"
+        )
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=(start, end))
+
+    def pl_by_period(self, start, end):
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT period, line, particulars, col, value FROM pl_summary "
+                "WHERE period BETWEEN ? AND ? ORDER BY period, line",
+                conn,
+                params=(start, end),
+            )
+
+
+def _pl_records(period, frame):
+    """Long-form (period, line, particulars, column, value) rows for a P&L Summary sheet."""
+    frame = frame.dropna(how="all")
+    labels = frame[frame.columns[0]].map(lambda v: None if pd.isna(v) else str(v).strip()).to_numpy(dtype=object)
+    value_cols = [str(col) for col in frame.columns[1:]]
+    values = formatting.parse_numeric(frame[frame.columns[1:]]).to_numpy(dtype=np.float64)
+    n, m = values.shape
+    flat = values.ravel().astype(object)
+    flat[np.isnan(values.ravel())] = None
+    return list(zip(
+        [period] * (n * m),
+        np.repeat(np.arange(n), m).tolist(),
+        np.repeat(labels, m).tolist(),
+        np.tile(np.array(value_cols, dtype=object), n).tolist(),
+        flat.tolist(),
+    ))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def default_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
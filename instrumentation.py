@@ -0,0 +1,176 @@
+"""Opt-in per-stage timings and memory for dashboard reruns.
+
+Each rerun gets a ``Recorder``; the dashboard wraps its stages (parse,
+aggregation, formatting, chart rendering, table serialization) in
+``recorder.stage(...)``. A stage records wall time, the tracemalloc delta
+and peak over the stage, the process peak RSS and an optional row count.
+Records are shown in a sidebar panel and appended as JSON lines to
+``LOG_PATH`` so runs can be compared across deployments. tracemalloc slows
+allocation-heavy code for every session in the process, so it only runs while
+at least one session has diagnostics on. Its counters are process-wide:
+memory figures include whatever concurrent sessions allocate meanwhile.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ENABLED = os.environ.get("CXO_PROFILE", "0") != "0"
+LOG_PATH = Path(os.environ.get(
+    "CXO_PROFILE_LOG",
+    Path.home() / ".cache" / "cxo_dashboard" / "profile.jsonl",
+))
+# Free-form label written with every record, e.g. a release tag
+DEPLOYMENT = os.environ.get("CXO_DEPLOYMENT", "")
+# Records kept per session for the panel's download
+SESSION_RECORDS = 2000
+# A session that stops rerunning (closed tab) stops counting after this (seconds)
+TRACE_LEASE = float(os.environ.get("CXO_SESSION_LEASE", "1800"))
+
+# Sessions with diagnostics on -> time of their last rerun
+_tracing_sessions = {}
+_tracing_lock = threading.Lock()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _update_tracing(session, enabled):
+    """Register ``session``'s diagnostics setting; tracemalloc runs only while some session has it on."""
+    with _tracing_lock:
+        now = time.monotonic()
+        if enabled:
+            _tracing_sessions[session] = now
+        else:
+            _tracing_sessions.pop(session, None)
+        for other, seen in list(_tracing_sessions.items()):
+            if now - seen > TRACE_LEASE:
+                del _tracing_sessions[other]
+        if _tracing_sessions and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not _tracing_sessions and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class Recorder:
+    """Stage records for one rerun; a disabled recorder only runs the stages."""
+
+    def __init__(self, enabled=False, session=None):
+        self.enabled = enabled
+        self.session = session
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records = []
+        self._stack = []
+        self._started = time.perf_counter()
+        _update_tracing(session, enabled)
+
+    @contextmanager
+    def stage(self, name, view=None, rows=None):
+        """Time the enclosed block; set ``record["rows"]`` inside it if the count is known late."""
+        record = {"stage": name, "view": view, "rows": rows}
+        if not self.enabled:
+            yield record
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            # Fold the peak so far into the enclosing stage before resetting it
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        frame = {"start": current, "peak": current}
+        # Listed in start order, so nested stages follow their parent
+        record["depth"] = len(self._stack)
+        self.records.append(record)
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            frame["peak"] = max(frame["peak"], peak)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], frame["peak"])
+            record.update({
+                "wall_ms": round(wall * 1000, 2),
+                "mem_delta_kb": round((current - frame["start"]) / 1024, 1),
+                "mem_peak_kb": round((frame["peak"] - frame["start"]) / 1024, 1),
+                "rss_peak_mb": peak_rss_mb(),
+            })
+
+    def finish(self, log_path=LOG_PATH):
+        """Stamp the records of this run and append them to ``log_path`` as JSON lines."""
+        if not self.enabled:
+            return []
+        total = {
+            "stage": "rerun",
+            "view": None,
+            "rows": None,
+            "wall_ms": round((time.perf_counter() - self._started) * 1000, 2),
+            "rss_peak_mb": peak_rss_mb(),
+            "depth": 0,
+        }
+        stamp = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "run": self.run_id,
+            "session": self.session,
+            "deployment": DEPLOYMENT,
+        }
+        records = [{**stamp, **record} for record in self.records + [total]]
+        if log_path:
+            try:
+                log_path = Path(log_path)
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(log_path, "a", encoding="utf-8") as fh:
+                    fh.writelines(json.dumps(record, default=str) + "\n" for record in records)
+            except OSError:
+                pass  # diagnostics must never break the dashboard
+        return records
+
+
+def show_panel(records, history, cache_stats=None):
+    """Sidebar diagnostics for this rerun, plus a JSON lines download of the session's records.
+
+    ``cache_stats`` (see ``workbook_cache.stats``) adds a line on the shared sheet cache.
+    """
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        if not records:
+            st.caption("No stages recorded yet.")
+            return
+        table = pd.DataFrame(records)
+        table["stage"] = ["  " * depth + stage for stage, depth in zip(table["stage"], table["depth"])]
+        columns = [col for col in ["stage", "view", "wall_ms", "mem_delta_kb", "mem_peak_kb", "rows"] if col in table]
+        st.dataframe(table[columns], hide_index=True)
+        rss = records[-1].get("rss_peak_mb")
+        st.caption(f"Rerun {records[-1]['wall_ms']:,.0f} ms" + (f", peak RSS {rss:,.0f} MB" if rss else ""))
+        st.caption("Memory figures are process-wide and include other sessions' work during a stage.")
+        if cache_stats:
+            st.caption(
+                f"Sheet cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 2 ** 20:,.0f} MB, "
+                f"{cache_stats['loads']} loads, {cache_stats['held_workbooks']} workbook(s) in use"
+            )
+        st.download_button(
+            "Download timings (JSON lines)",
+            "".join(json.dumps(record, default=str) + "\n" for record in history),
+            file_name="cxo_dashboard_timings.jsonl",
+            mime="application/jsonl",
+        )
@@ -0,0 +1,181 @@
+"""Schema layer for the Profitability sheet: logical fields -> sheet columns.
+
+Every logical field (the six dimensions and the KPIs) has a list of aliases.
+Headers are resolved once per workbook into a ``ColumnMap``:
+
+1. exact: the normalized header equals a normalized alias
+   ("Net  Earnings " == "net earnings");
+2. token: the alias appears as whole words in the header ("AM" matches
+   "AM Name" and "Key AM", never "Amount" or "CAMPAIGN").
+
+Exact matches are assigned for all fields before any token match, and a
+column is used for at most one field. ``prepare`` then validates dtypes at
+ingest: KPI columns are converted to numbers (comma strings included) and
+renamed to their canonical names, so aggregation never rescans headers or
+re-parses values. The result is cached per workbook as a ``PreparedSheet``. Extra aliases can be supplied as a JSON file
+(``{"AM": ["Relationship Manager"]}``) via ``CXO_SCHEMA_ALIASES``.
+"""
+import json
+import os
+import re
+
+import pandas as pd
+
+import aggregation
+import formatting
+
+# Logical field -> header aliases (compared after ``normalize``)
+DIMENSION_ALIASES = {
+    "Product": ["Product", "Product Name", "Product Type"],
+    "Zone": ["Zone", "Zone Name"],
+    "BD": ["BD", "BD Name", "Business Development"],
+    "AM": ["AM", "AM Name", "Account Manager"],
+    "Segment": ["Segment", "Merchant Segment"],
+    "State": ["State", "State Name"],
+}
+
+KPI_ALIASES = {
+    "Number of Transaction": ["Number of Transaction", "Number of Transactions", "No of Transactions", "Txn Count"],
+    "GMV": ["GMV", "Gross Merchandise Value"],
+    "Gross Revenue": ["Gross Revenue"],
+    "Bank & PG Charges": ["Bank & PG Charges", "Bank and PG Charges", "PG Charges"],
+    "Referral Charges": ["Referral Charges"],
+    "Net Earnings": ["Net Earnings"],
+}
+
+ALIASES_FILE = os.environ.get("CXO_SCHEMA_ALIASES")
+
+
+def normalize(name):
+    """Lower-case words of a header: camelCase, punctuation and spacing are ignored ("&" is kept)."""
+    text = re.sub(r"(?<=[a-z])(?=[A-Z])", " ", str(name))
+    return " ".join(re.findall(r"[a-z0-9]+|&", text.casefold()))
+
+
+def load_aliases(path=ALIASES_FILE):
+    """Default aliases per field, extended with those in the JSON file at ``path``."""
+    aliases = {field: list(names) for field, names in {**DIMENSION_ALIASES, **KPI_ALIASES}.items()}
+    if path:
+        with open(path, encoding="utf-8") as fh:
+            for field, names in json.load(fh).items():
+                if field not in aliases:
+                    raise ValueError(f"Unknown field in {path}: {field!r}")
+                aliases[field] += [name for name in names if name not in aliases[field]]
+    return aliases
+
+
+def _token_match(header_words, alias_words):
+    n = len(alias_words)
+    return any(header_words[i:i + n] == alias_words for i in range(len(header_words) - n + 1))
+
+
+class ColumnMap:
+    """Resolved sheet column per logical field, plus validation notes."""
+
+    def __init__(self, dimensions, kpis, issues=()):
+        self.dimensions = dict(dimensions)
+        self.kpis = dict(kpis)
+        self.issues = list(issues)
+
+    @property
+    def kpi_names(self):
+        """Canonical names of the KPIs present, in dashboard order."""
+        return [kpi for kpi in aggregation.KPI_COLUMNS if kpi in self.kpis]
+
+    @property
+    def missing(self):
+        fields = list(DIMENSION_ALIASES) + list(KPI_ALIASES)
+        return [field for field in fields if field not in self.dimensions and field not in self.kpis]
+
+    def describe(self):
+        """(field, column) pairs for display."""
+        return [(field, str(col)) for field, col in {**self.dimensions, **self.kpis}.items()]
+
+
+def resolve(columns, aliases=None):
+    """Match sheet ``columns`` to the logical fields."""
+    aliases = load_aliases() if aliases is None else aliases
+    columns = list(columns)
+    words = [normalize(col).split() for col in columns]
+    fields = list(DIMENSION_ALIASES) + list(KPI_ALIASES)
+    alias_words = {field: [normalize(alias).split() for alias in aliases.get(field, [])] for field in fields}
+
+    found, claimed, issues = {}, set(), []
+    for rule in ("exact", "token"):
+        for field in fields:
+            if field in found:
+                continue
+            matches = [
+                i for i, header in enumerate(words)
+                if i not in claimed and header and any(
+                    header == alias if rule == "exact" else _token_match(header, alias)
+                    for alias in alias_words[field] if alias
+                )
+            ]
+            if not matches:
+                continue
+            found[field] = matches[0]
+            claimed.add(matches[0])
+            if len(matches) > 1:
+                others = ", ".join(repr(str(columns[i])) for i in matches[1:])
+                issues.append(f"{field}: several columns match; using {str(columns[matches[0]])!r} over {others}.")
+
+    dimensions = {field: columns[found[field]] for field in DIMENSION_ALIASES if field in found}
+    kpis = {field: columns[found[field]] for field in KPI_ALIASES if field in found}
+    return ColumnMap(dimensions, kpis, issues)
+
+
+class PreparedSheet:
+    """A sheet's typed frame, its column map and the values that failed validation."""
+
+    def __init__(self, frame, column_map, invalid, copied=False):
+        self.frame = frame
+        self.column_map = column_map
+        self.invalid = dict(invalid)
+        self._copied = copied
+
+    @property
+    def nbytes(self):
+        # An unconverted sheet is the cached source frame itself
+        return int(self.frame.memory_usage(deep=False).sum()) if self._copied else 0
+
+    @property
+    def issues(self):
+        return issue_messages(self.column_map, self.invalid)
+
+
+def issue_messages(column_map, invalid):
+    """Readable validation notes for a column map and per-KPI counts of non-numeric values."""
+    messages = list(column_map.issues)
+    if column_map.missing:
+        messages.append(f"No column found for: {', '.join(column_map.missing)}.")
+    for kpi, count in invalid.items():
+        if count:
+            col = column_map.kpis[kpi]
+            messages.append(f"{kpi}: {count:,} value(s) in {str(col)!r} are not numbers and count as 0.")
+    return messages
+
+
+def prepare(df, column_map=None):
+    """Validate ``df`` and return a ``PreparedSheet`` whose KPI columns are numeric
+    and named canonically. ``df`` itself is never modified and is reused as is
+    when nothing needs converting or renaming.
+    """
+    column_map = resolve(df.columns) if column_map is None else column_map
+    converted, renames, invalid = {}, {}, {}
+    for kpi, col in column_map.kpis.items():
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            parsed = formatting.parse_numeric(values)
+            invalid[kpi] = int((parsed.isna() & values.notna()).sum())
+            converted[col] = parsed
+        if col != kpi:
+            renames[col] = kpi
+    if not converted and not renames:
+        return PreparedSheet(df, column_map, invalid)
+    frame = df.copy(deep=False)
+    for col, values in converted.items():
+        frame[col] = values
+    if renames:
+        frame = frame.rename(columns=renames)
+    return PreparedSheet(frame, column_map, invalid, copied=True)
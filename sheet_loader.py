@@ -0,0 +1,118 @@
+"""Parallel loading of the dashboard's sheets as soon as a workbook is uploaded.
+
+The header mode of every sheet is sniffed in a single read-only pass over the
+workbook, then each known sheet is parsed concurrently by a thread pool that
+fills the shared workbook cache. For large workbooks the XLSX parsing itself
+runs in worker processes (openpyxl is pure Python, so threads alone would
+serialise on the GIL): each worker runs ``snapshot.py convert`` and the
+result is memory-mapped back from the snapshot. Tabs ask for their own sheet
+and render as soon as it is ready.
+"""
+import io
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import openpyxl
+
+import snapshot
+import workbook_cache
+
+KNOWN_SHEETS = ["Profitability", "Dashboard Summary", "P&L Summary"]
+SNIFF_ROWS = 5
+# "process" parses large workbooks in worker processes, "thread" in the pool threads
+LOADER_MODE = os.environ.get("CXO_LOADER", "process")
+MAX_WORKERS = int(os.environ.get("CXO_LOADER_WORKERS", str(min(len(KNOWN_SHEETS), os.cpu_count() or 1))))
+# Below this size a worker process costs more to start than the parse (MB)
+PROCESS_MIN_BYTES = int(float(os.environ.get("CXO_PROCESS_PARSE_MB", "2")) * 1024 * 1024)
+
+_threads = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="sheet-loader")
+SNAPSHOT_SCRIPT = Path(__file__).with_name("snapshot.py")
+
+
+def sniff_headers(data):
+    """Sheet names and header mode per sheet from one read-only pass.
+
+    A sheet whose first rows span at most one column, or that has no data
+    below its first row, is read with ``header=None`` (the sheet has no usable
+    header row); every other sheet uses the first row as header.
+    """
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        headers = {}
+        for ws in wb.worksheets:
+            rows = list(ws.iter_rows(max_row=SNIFF_ROWS, values_only=True))
+            width = max((max((i + 1 for i, v in enumerate(row) if v is not None), default=0) for row in rows), default=0)
+            headers[ws.title] = None if len(rows) <= 1 or width <= 1 else 0
+        return wb.sheetnames, headers
+    finally:
+        wb.close()
+
+
+def _convert_in_subprocess(data, sheet_name, header, digest):
+    # Not multiprocessing: under Streamlit the "__main__" module is the
+    # dashboard script, which spawned children would re-execute
+    with snapshot.workbook_copy(data) as path:
+        command = [
+            sys.executable, str(SNAPSHOT_SCRIPT), "convert", str(path),
+            "--sheet", sheet_name, "--digest", digest, "--snapshot-dir", str(snapshot.SNAPSHOT_DIR),
+        ]
+        if header is None:
+            command.append("--no-header")
+        return subprocess.run(command, capture_output=True).returncode == 0
+
+
+def _parse(data, sheet_name, header, digest):
+    df = snapshot.read_snapshot(digest, sheet_name, header)
+    if df is not None:
+        return df
+    if LOADER_MODE == "process" and snapshot.enabled() and len(data) >= PROCESS_MIN_BYTES:
+        try:
+            if _convert_in_subprocess(data, sheet_name, header, digest):
+                df = snapshot.read_snapshot(digest, sheet_name, header)
+        except OSError:
+            df = None
+        if df is not None:
+            return df
+    # Small workbook, no snapshot support, or the worker could not write it
+    return snapshot.load_sheet(data, sheet_name, header, digest)
+
+
+def _load(data, sheet_name, header, digest):
+    # Keyed per sheet and header mode so concurrent sessions share a single parse
+    return workbook_cache.get_or_compute((digest, sheet_name, header), lambda: _parse(data, sheet_name, header, digest))
+
+
+class WorkbookLoader:
+    """Futures for the known sheets of one uploaded workbook."""
+
+    def __init__(self, data, digest, sheet_names, headers, futures):
+        self.data = data
+        self.digest = digest
+        self.sheet_names = sheet_names
+        self.headers = headers
+        self._futures = futures
+
+    def header(self, sheet_name):
+        return self.headers.get(sheet_name, 0)
+
+    def result(self, sheet_name):
+        """Block until ``sheet_name`` is parsed and return it (shared; do not mutate)."""
+        future = self._futures.get(sheet_name)
+        if future is None:
+            return _load(self.data, sheet_name, self.header(sheet_name), self.digest)
+        return future.result()
+
+
+def start(data, digest, sheets=None):
+    """Sniff headers and start parsing ``sheets`` (default: the known sheets) in parallel."""
+    sheet_names, headers = workbook_cache.get_or_compute((digest, "__headers__"), lambda: sniff_headers(data))
+    wanted = KNOWN_SHEETS if sheets is None else sheets
+    futures = {
+        name: _threads.submit(_load, data, name, headers[name], digest)
+        for name in wanted
+        if name in headers
+    }
+    return WorkbookLoader(data, digest, sheet_names, headers, futures)
@@ -0,0 +1,312 @@
+"""Columnar on-disk snapshots of uploaded workbook sheets.
+
+Each sheet is converted once from XLSX into an uncompressed Arrow IPC (Feather
+v2) file under the snapshot directory, keyed on the workbook content hash.
+Later sessions, and other users uploading the same file, memory-map the
+snapshot instead of parsing the workbook again. Object columns Arrow cannot
+type (numbers mixed with "1,234"-style strings) are stored as text, and column
+labels that are not strings (month dates, positions) are stored as strings
+with the originals in the file's schema metadata, so every sheet is kept as
+Arrow; snapshots hold data only, never pickled objects.
+
+Whenever a snapshot is written, workbooks whose snapshots went unused for
+``CXO_SNAPSHOT_TTL_DAYS`` are deleted, then the least recently used ones
+until the directory is under ``CXO_SNAPSHOT_MAX_MB``.
+
+Pre-convert a directory of workbooks offline with:
+
+    python snapshot.py ingest path/to/workbooks
+
+``python snapshot.py convert`` converts a single sheet; the dashboard's sheet
+loader runs it in worker processes.
+"""
+import argparse
+import contextlib
+import datetime
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # snapshots are an optimisation; fall back to plain parsing
+    pa = None
+    feather = None
+
+SNAPSHOT_DIR = Path(os.environ.get(
+    "CXO_SNAPSHOT_DIR",
+    Path.home() / ".cache" / "cxo_dashboard" / "snapshots",
+))
+# Workbooks whose snapshots were not used for this long are deleted (days)
+MAX_AGE_DAYS = float(os.environ.get("CXO_SNAPSHOT_TTL_DAYS", "30"))
+# Beyond this total size the least recently used workbooks are deleted (MB)
+MAX_TOTAL_MB = float(os.environ.get("CXO_SNAPSHOT_MAX_MB", "2048"))
+
+
+def enabled():
+    return pa is not None and os.environ.get("CXO_SNAPSHOTS", "1") != "0"
+
+
+# Schema metadata key holding the original column labels
+LABELS_KEY = b"cxo_dashboard.columns"
+
+
+def _sheet_path(digest, sheet_name, header, root=None):
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", sheet_name).strip("_") or "sheet"
+    # The slug alone could collide ("P&L" vs "P L"), so keep the raw name's hash
+    name_hash = hashlib.sha1(sheet_name.encode("utf-8")).hexdigest()[:8]
+    mode = "noheader" if header is None else f"h{header}"
+    return Path(root or SNAPSHOT_DIR) / digest / f"{slug}-{name_hash}-{mode}.arrow"
+
+
+def _touch(path):
+    # A workbook directory's mtime is its last use, for eviction
+    try:
+        os.utime(path.parent)
+    except OSError:
+        pass
+
+
+def has_snapshot(digest, sheet_name, header=0, root=None):
+    return _sheet_path(digest, sheet_name, header, root).exists()
+
+
+def _atomic_write(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _encode_label(label):
+    if isinstance(label, str):
+        return ["str", label]
+    if isinstance(label, (bool, np.bool_)):
+        return ["bool", bool(label)]
+    if isinstance(label, (int, np.integer)):
+        return ["int", int(label)]
+    if isinstance(label, (float, np.floating)):
+        return ["float", float(label)]
+    if isinstance(label, (datetime.date, pd.Timestamp)):
+        return ["datetime", pd.Timestamp(label).isoformat()]
+    if label is None:
+        return ["none", None]
+    return ["str", str(label)]
+
+
+def _decode_label(kind, value):
+    if kind == "datetime":
+        return pd.Timestamp(value)
+    return value
+
+
+def _as_text(col):
+    """Object column as str cells, keeping missing values missing."""
+    return col.map(lambda v: v if isinstance(v, str) or pd.isna(v) else str(v))
+
+
+def _arrow_table(df):
+    """``df`` as an Arrow table, or None if a column still cannot be stored."""
+    labels = list(df.columns)
+    names = [str(label) for label in labels]
+    if len(set(names)) < len(names):  # e.g. 1 and "1"
+        names = [f"{i}:{name}" for i, name in enumerate(names)]
+    frame = df.set_axis(names, axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            table = pa.Table.from_pandas(frame)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Object columns mixing numbers and "1,234"-style strings
+            frame = frame.copy()
+            for name in frame.columns[(frame.dtypes == object).to_numpy()]:
+                frame[name] = _as_text(frame[name])
+            try:
+                table = pa.Table.from_pandas(frame)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+                return None
+    if names != labels:
+        metadata = dict(table.schema.metadata or {})
+        metadata[LABELS_KEY] = json.dumps([_encode_label(label) for label in labels]).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
+def read_snapshot(digest, sheet_name, header=0, root=None):
+    if not enabled():
+        return None
+    path = _sheet_path(digest, sheet_name, header, root)
+    try:
+        table = feather.read_table(path, memory_map=True)
+        df = table.to_pandas(split_blocks=True)
+    except (OSError, ValueError, EOFError, pa.ArrowInvalid):
+        # Missing (e.g. evicted meanwhile) or unreadable
+        return None
+    labels = (table.schema.metadata or {}).get(LABELS_KEY)
+    if labels is not None:
+        df.columns = pd.Index([_decode_label(kind, value) for kind, value in json.loads(labels)])
+    _touch(path)
+    return df
+
+
+def write_snapshot(df, digest, sheet_name, header=0, root=None):
+    """Write ``df`` as an Arrow snapshot; returns False if it could not be written."""
+    if not enabled():
+        return False
+    path = _sheet_path(digest, sheet_name, header, root)
+    table = _arrow_table(df)
+    if table is None:
+        return False
+    try:
+        _atomic_write(path, lambda tmp: feather.write_feather(table, tmp, compression="uncompressed"))
+    except OSError:
+        return False
+    _touch(path)
+    evict(root, keep=digest)
+    return True
+
+
+def evict(root=None, keep=None, max_age_days=MAX_AGE_DAYS, max_total_mb=MAX_TOTAL_MB):
+    """Delete workbook snapshots unused for ``max_age_days``, then the least
+    recently used ones until the total is under ``max_total_mb``. ``keep`` (a
+    digest) is never deleted. Returns the digests removed.
+    """
+    root = Path(root or SNAPSHOT_DIR)
+    workbooks = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.is_dir() or entry.name == keep:
+            continue
+        try:
+            size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+            workbooks.append((entry.stat().st_mtime, size, entry.path))
+        except OSError:
+            continue  # removed concurrently
+    workbooks.sort()
+    total = sum(size for _, size, _ in workbooks)
+    try:
+        total += sum(f.stat().st_size for f in os.scandir(root / keep) if f.is_file()) if keep else 0
+    except OSError:
+        pass
+    cutoff = time.time() - max_age_days * 86400
+    removed = []
+    for used, size, path in workbooks:
+        if used >= cutoff and total <= max_total_mb * 1024 * 1024:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(os.path.basename(path))
+    return removed
+
+
+def load_sheet(data, sheet_name, header, digest, root=None):
+    """Drop-in for ``pd.read_excel(xls, sheet_name=..., header=...)``.
+
+    Reads the memory-mapped snapshot when one exists, otherwise parses the
+    workbook and writes the snapshot for next time.
+    """
+    df = read_snapshot(digest, sheet_name, header, root)
+    if df is None:
+        df = pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, header=header)
+        write_snapshot(df, digest, sheet_name, header, root)
+    return df
+
+
+@contextlib.contextmanager
+def workbook_copy(data):
+    """Temporary copy of the workbook on disk, for worker processes; removed on exit."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx", prefix="cxo-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        yield Path(path)
+    finally:
+        os.remove(path)
+
+
+def convert_sheet(path, sheet_name, header=0, digest=None, root=None):
+    """Parse one sheet of the workbook at ``path`` and write its snapshot."""
+    from workbook_cache import content_hash
+
+    if digest is None:
+        digest = content_hash(Path(path).read_bytes())
+    df = pd.read_excel(path, sheet_name=sheet_name, header=header)
+    return write_snapshot(df, digest, sheet_name, header, root)
+
+
+def ingest_directory(directory, root=None, force=False):
+    """Convert every sheet of every .xlsx under ``directory``; returns a summary per file."""
+    from sheet_loader import sniff_headers
+    from workbook_cache import content_hash
+
+    results = []
+    for path in sorted(Path(directory).rglob("*.xlsx")):
+        if path.name.startswith("~$"):  # Excel lock files
+            continue
+        data = path.read_bytes()
+        digest = content_hash(data)
+        # Same header mode per sheet as the dashboard, so its lookups hit
+        sheet_names, headers = sniff_headers(data)
+        xls = pd.ExcelFile(io.BytesIO(data))
+        converted, skipped = [], []
+        for sheet in sheet_names:
+            header = headers[sheet]
+            if not force and has_snapshot(digest, sheet, header, root):
+                skipped.append(sheet)
+                continue
+            df = pd.read_excel(xls, sheet_name=sheet, header=header)
+            (converted if write_snapshot(df, digest, sheet, header, root) else skipped).append(sheet)
+        results.append({"file": str(path), "digest": digest, "converted": converted, "skipped": skipped})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage columnar snapshots of dashboard workbooks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Pre-convert a directory of .xlsx workbooks")
+    ingest.add_argument("directory")
+    ingest.add_argument("--snapshot-dir", default=None, help=f"Output directory (default: {SNAPSHOT_DIR})")
+    ingest.add_argument("--force", action="store_true", help="Re-convert sheets that already have a snapshot")
+    convert = sub.add_parser("convert", help="Convert a single sheet of one workbook")
+    convert.add_argument("workbook")
+    convert.add_argument("--sheet", required=True)
+    convert.add_argument("--no-header", action="store_true", help="Read the sheet with header=None")
+    convert.add_argument("--digest", default=None, help="Content hash of the workbook, if already known")
+    convert.add_argument("--snapshot-dir", default=None)
+    args = parser.parse_args(argv)
+
+    if not enabled():
+        parser.error("pyarrow is required to write snapshots")
+    if args.command == "convert":
+        header = None if args.no_header else 0
+        written = convert_sheet(args.workbook, args.sheet, header, args.digest, args.snapshot_dir)
+        # Exit status 3: the snapshot could not be written, parse it directly
+        return 0 if written else 3
+    for result in ingest_directory(args.directory, args.snapshot_dir, args.force):
+        print(f"{result['file']}: {len(result['converted'])} converted, "
+              f"{len(result['skipped'])} skipped ({result['digest'][:12]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
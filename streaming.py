@@ -0,0 +1,139 @@
+"""Streaming ingestion for Profitability sheets too large to hold in memory.
+
+The sheet is read row block by row block with openpyxl in read-only mode.
+Each block is validated against the column map resolved from the header
+(see schema.py), downcast (categoricals for the dimension columns, the narrowest
+lossless numeric type for the KPIs) and folded into the dimension aggregates
+and KPI totals, then dropped. Only a small preview window of rows is kept.
+"""
+import io
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import aggregation
+import schema
+
+BLOCK_ROWS = 50000
+PREVIEW_ROWS = 1000
+# Uploads larger than this are streamed by default (MB)
+THRESHOLD_BYTES = int(os.environ.get("CXO_STREAMING_MB", "25")) * 1024 * 1024
+
+
+def _header_names(row):
+    names, seen = [], {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None else value
+        # Mangle duplicates the way pd.read_excel does ("GMV", "GMV.1", ...)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def iter_row_blocks(data, sheet_name, block_rows=BLOCK_ROWS):
+    """Yield the sheet as DataFrames of at most ``block_rows`` rows (first row is the header)."""
+    wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        names = _header_names(header)
+        width = len(names)
+        block = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            block.append(row[:width])
+            if len(block) >= block_rows:
+                yield pd.DataFrame.from_records(block, columns=names)
+                block = []
+        if block:
+            yield pd.DataFrame.from_records(block, columns=names)
+    finally:
+        wb.close()
+
+
+def _downcast_numeric(col):
+    col = pd.to_numeric(col, errors="coerce")
+    values = col.to_numpy(dtype=np.float64, na_value=np.nan)
+    finite = values[~np.isnan(values)]
+    if len(finite) == len(values) and np.array_equal(finite, np.trunc(finite)):
+        info = np.iinfo(np.int32)
+        if len(finite) == 0 or (finite.min() >= info.min and finite.max() <= info.max):
+            return col.astype(np.int32)
+        return col.astype(np.int64)
+    as_float32 = values.astype(np.float32)
+    # float32 only where it round-trips exactly; large currency values keep float64
+    if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+        return pd.Series(as_float32, index=col.index, name=col.name)
+    return col.astype(np.float64)
+
+
+def downcast(frame, dimension_columns, kpis):
+    frame = frame.copy()
+    for col in set(dimension_columns.values()):
+        frame[col] = frame[col].astype("category")
+    for kpi in kpis:
+        frame[kpi] = _downcast_numeric(frame[kpi])
+    return frame
+
+
+class StreamedSheet:
+    """Aggregates, KPI totals and a preview window built from a streamed sheet."""
+
+    def __init__(self, columns, aggregator, totals, preview, column_map=None, invalid=None):
+        self.columns = columns
+        self.aggregator = aggregator
+        self.totals = totals
+        self.preview = preview
+        self.column_map = column_map or schema.ColumnMap({}, {})
+        self.invalid = dict(invalid or {})
+
+    @property
+    def issues(self):
+        return schema.issue_messages(self.column_map, self.invalid)
+
+    @property
+    def row_count(self):
+        return self.totals.row_count
+
+    @property
+    def nbytes(self):
+        return self.aggregator.nbytes + int(self.preview.memory_usage(deep=True).sum())
+
+
+def stream_sheet(data, sheet_name="Profitability", block_rows=BLOCK_ROWS, preview_rows=PREVIEW_ROWS):
+    aggregator = totals = column_map = None
+    columns = []
+    invalid = {}
+    preview_parts, preview_len = [], 0
+    for block in iter_row_blocks(data, sheet_name, block_rows):
+        if aggregator is None:
+            # Headers are resolved once, from the first block
+            columns = list(block.columns)
+            column_map = schema.resolve(columns)
+            aggregator = aggregation.DimensionAggregator(column_map.dimensions, column_map.kpi_names)
+            totals = aggregation.RunningTotals(column_map.kpi_names)
+        if preview_len < preview_rows:
+            part = block.iloc[:preview_rows - preview_len]
+            preview_parts.append(part)
+            preview_len += len(part)
+        prepared = schema.prepare(block, column_map)
+        for kpi, count in prepared.invalid.items():
+            invalid[kpi] = invalid.get(kpi, 0) + count
+        block = downcast(prepared.frame, aggregator.dimension_columns, aggregator.kpis)
+        aggregator.add(block)
+        totals.add(block)
+
+    if aggregator is None:
+        aggregator = aggregation.DimensionAggregator({}, [])
+        totals = aggregation.RunningTotals([])
+    preview = pd.concat(preview_parts, ignore_index=True) if preview_parts else pd.DataFrame(columns=columns)
+    return StreamedSheet(columns, aggregator.finalize(), totals, preview, column_map, invalid)
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The dashboard's modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Logical dimension -> sheet column, as named in the real workbooks
+DIMENSION_COLUMNS = {
+    "Product": "Product Name",
+    "Zone": "Zone",
+    "BD": "BD Name",
+    "AM": "AM Name",
+    "Segment": "Segment",
+    "State": "State",
+}
+SIZES = {"Product": 6, "Zone": 4, "BD": 15, "AM": 80, "Segment": 3, "State": 12}
+KPIS = ["Number of Transaction", "GMV", "Gross Revenue", "Bank & PG Charges", "Referral Charges", "Net Earnings"]
+
+
+def make_profitability(rows, seed=0):
+    """Profitability rows with every dimension and KPI; some Zones are missing and GMV is float."""
+    rng = np.random.default_rng(seed)
+    data = {
+        col: np.array([f"{dim} {i}" for i in range(SIZES[dim])], dtype=object)[rng.integers(0, SIZES[dim], rows)]
+        for dim, col in DIMENSION_COLUMNS.items()
+    }
+    for kpi in KPIS:
+        data[kpi] = rng.integers(1, 10000, rows, dtype=np.int64)
+    df = pd.DataFrame(data)
+    df.loc[::97, "Zone"] = None
+    df["GMV"] = df["GMV"] + 0.25
+    return df
+
+
+@pytest.fixture(scope="session")
+def profitability():
+    return make_profitability(5000, seed=3)
+
+
+@pytest.fixture(scope="session")
+def dimension_columns():
+    return dict(DIMENSION_COLUMNS)
+
+
+@pytest.fixture(scope="session")
+def kpis():
+    return list(KPIS)
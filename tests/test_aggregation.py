@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+import sys
+
+import pandas as pd
+import pytest
+
+import aggregation
+
+VIEWS = {
+    "Product": ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"],
+    "Zone": ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"],
+    "BD": ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"],
+    "AM": ["Number of Transaction", "GMV", "Gross Revenue", "Net Earnings"],
+    "Segment": ["GMV", "Gross Revenue", "Net Earnings"],
+    "State": ["GMV", "Gross Revenue", "Net Earnings"],
+}
+
+
+def grouped(frame, columns, kpis):
+    return frame.groupby(columns, sort=True)[kpis].sum().reset_index()
+
+
+@pytest.fixture(scope="module")
+def aggregates(profitability, dimension_columns, kpis):
+    return aggregation.aggregate_dimensions(profitability, dimension_columns, kpis)
+
+
+@pytest.mark.parametrize("dim", list(VIEWS))
+def test_view_matches_groupby(profitability, dimension_columns, aggregates, dim):
+    expected = grouped(profitability, [dimension_columns[dim]], VIEWS[dim])
+    pd.testing.assert_frame_equal(aggregates.view(dim, VIEWS[dim]), expected, check_dtype=False)
+
+
+def test_integer_kpis_stay_integer(aggregates):
+    view = aggregates.dimension("Product")
+    assert pd.api.types.is_integer_dtype(view["Number of Transaction"])
+    assert pd.api.types.is_float_dtype(view["GMV"])
+
+
+def test_blocks_fold_like_one_pass(profitability, dimension_columns, kpis, aggregates):
+    blocks = aggregation.DimensionAggregator(dimension_columns, kpis)
+    for start in range(0, len(profitability), 700):
+        blocks.add(profitability.iloc[start:start + 700])
+    blocks.finalize()
+    for dim in dimension_columns:
+        pd.testing.assert_frame_equal(blocks.dimension(dim), aggregates.dimension(dim))
+
+
+def test_running_totals_match_frame_sums(profitability, kpis):
+    totals = aggregation.RunningTotals(kpis)
+    for start in range(0, len(profitability), 1200):
+        totals.add(profitability.iloc[start:start + 1200])
+    assert totals.row_count == len(profitability)
+    for kpi in kpis:
+        assert totals.sums[kpi] == pytest.approx(profitability[kpi].sum())
+
+
+def test_aggregator_totals_match_frame_sums(profitability, kpis, aggregates):
+    totals = aggregates.totals()
+    assert totals.row_count == len(profitability)
+    assert totals.sums["Number of Transaction"] == profitability["Number of Transaction"].sum()
+    assert isinstance(totals.sums["Number of Transaction"], int)
+    for kpi in kpis:
+        assert totals.sums[kpi] == pytest.approx(profitability[kpi].sum())
+
+
+def test_tracker_reads_totals_once_per_workbook(aggregates):
+    class Counting:
+        calls = 0
+
+        def totals(self):
+            Counting.calls += 1
+            return aggregates.totals()
+
+    tracker = aggregation.TotalsTracker()
+    for _ in range(3):
+        tracker.update("may.xlsx", "a", Counting())
+    assert Counting.calls == 1
+
+
+def test_tracker_sees_edits_before_appended_rows(profitability, dimension_columns, kpis, aggregates):
+    tracker = aggregation.TotalsTracker()
+    tracker.update("may.xlsx", "a", aggregates)
+    edited = pd.concat([profitability, profitability.iloc[:50]], ignore_index=True)
+    edited.loc[7, "GMV"] += 1e9
+    edited_aggregates = aggregation.aggregate_dimensions(edited, dimension_columns, kpis)
+    assert tracker.update("may.xlsx", "b", edited_aggregates)["GMV"] == pytest.approx(edited["GMV"].sum())
+
+
+def test_tracker_combines_sources(profitability, dimension_columns, kpis):
+    tracker = aggregation.TotalsTracker()
+    for source, part in (("may.xlsx", profitability.iloc[:2000]), ("june.xlsx", profitability.iloc[2000:])):
+        tracker.update(source, source, aggregation.aggregate_dimensions(part, dimension_columns, kpis))
+    assert len(tracker) == 2
+    assert tracker.combined()["Net Earnings"] == profitability["Net Earnings"].sum()
+
+
+@pytest.fixture(scope="module")
+def cube(aggregates):
+    return aggregation.RollupCube(aggregates, eager_dims=1)
+
+
+def test_cube_drill_down_matches_groupby(profitability, cube):
+    rows = profitability[profitability["Segment"].isin(["Segment 0", "Segment 2"]) & (profitability["State"] == "State 5")]
+    expected = grouped(rows, ["Zone", "Product Name"], ["GMV", "Net Earnings"])
+    got = cube.query(["Zone", "Product"], {"Segment": ["Segment 0", "Segment 2"], "State": "State 5"}, ["GMV", "Net Earnings"])
+    got = got.dropna(subset=["Zone"]).rename(columns={"Product": "Product Name"}).drop(columns="Rows").reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_cube_keeps_missing_labels(profitability, cube):
+    result = cube.query(["Zone"], kpis=["GMV"])
+    missing = result[result["Zone"].isna()]
+    assert missing["Rows"].tolist() == [profitability["Zone"].isna().sum()]
+    assert result["GMV"].sum() == pytest.approx(profitability["GMV"].sum())
+    assert cube.query(["Zone"], {"Zone": None})["Rows"].tolist() == missing["Rows"].tolist()
+
+
+def test_cube_values_and_grand_total(profitability, cube):
+    assert cube.values("Product", {"Zone": "Zone 1"}) == sorted(profitability.loc[profitability["Zone"] == "Zone 1", "Product Name"].unique())
+    total = cube.query([])
+    assert total["Rows"].tolist() == [len(profitability)]
+    assert total["Number of Transaction"].tolist() == [profitability["Number of Transaction"].sum()]
+
+
+def test_cube_builds_cuboids_safely_across_threads(profitability, aggregates):
+    # Switch threads often so size reads overlap cuboid insertion
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        cube = aggregation.RollupCube(aggregates, eager_dims=0)
+        combos = [list(c) for r in (2, 3) for c in combinations(cube.dimensions, r)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            sizes = [pool.submit(lambda: [cube.nbytes for _ in range(2000)]) for _ in range(2)]
+            results = list(pool.map(lambda group_by: cube.query(group_by, kpis=["GMV"])["Rows"].sum(), combos))
+            for future in sizes:
+                future.result()
+    finally:
+        sys.setswitchinterval(interval)
+    assert results == [len(profitability)] * len(combos)
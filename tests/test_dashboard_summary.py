@@ -0,0 +1,66 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard_summary as ds
+
+
+def test_month_headers_normalize_to_periods():
+    headers = ["Apr-24", "May 2024", datetime.datetime(2024, 6, 1), "Jul'24", "2024-08"]
+    periods = ds.normalize_months(headers)
+    assert [str(p) for p in periods] == ["2024-04", "2024-05", "2024-06", "2024-07", "2024-08"]
+
+
+def test_period_order_is_chronological():
+    headers = ["Jan-25", "Nov-24", "Dec-24"]
+    assert [headers[i] for i in ds.period_order(headers)] == ["Nov-24", "Dec-24", "Jan-25"]
+
+
+def test_numeric_block_parses_comma_strings():
+    block = pd.DataFrame({"a": ["1,234", 5, None], "b": [" 2,000.5 ", "-", 7.25]})
+    values = ds.parse_numeric_block(block)
+    np.testing.assert_array_equal(values, [[1234.0, 2000.5], [5.0, np.nan], [np.nan, 7.25]])
+
+
+@pytest.fixture
+def matrix():
+    df = pd.DataFrame({
+        "Particulars": [ds.REVENUE, ds.EBITDA, None],
+        "Jun-24": ["300", "30", None],
+        "Apr-24": ["100", "-10", None],
+        "May-24": ["200", "20", None],
+    })
+    return ds.parse_matrix(df)
+
+
+def test_parse_matrix_sorts_months_and_drops_blank_rows(matrix):
+    assert matrix.metrics == [ds.REVENUE, ds.EBITDA]
+    assert matrix.month_labels == ["Apr-24", "May-24", "Jun-24"]
+    np.testing.assert_array_equal(matrix.row(ds.REVENUE), [100, 200, 300])
+
+
+def test_derived_metrics(matrix):
+    np.testing.assert_allclose(matrix.ebitda_margin(), [-10, 10, 10])
+    np.testing.assert_allclose(matrix.mom_growth()[0], [np.nan, 100, 50])
+    np.testing.assert_allclose(matrix.trailing(3)[0], [np.nan, np.nan, 600])
+    derived = matrix.derived_frame([ds.REVENUE], window=2)
+    assert list(derived.index) == ["EBITDA Margin (%)", f"{ds.REVENUE} MoM Growth (%)", f"{ds.REVENUE} Trailing 2M"]
+    assert derived.loc[f"{ds.REVENUE} Trailing 2M"].tolist()[1:] == [300, 500]
+
+
+def test_total_and_ytd_columns_are_not_months():
+    df = pd.DataFrame({
+        "Particulars": [ds.REVENUE, ds.EBITDA],
+        "Apr-24": [100, 10],
+        "May-24": [200, 40],
+        "Total": [300, 50],
+        "2024": [300, 50],
+    })
+    matrix = ds.parse_matrix(df)
+    assert matrix.month_labels[:2] == ["Apr-24", "May-24"]
+    assert matrix.dated.tolist() == [True, True, False, False]
+    np.testing.assert_allclose(matrix.mom_growth()[0], [np.nan, 100])
+    np.testing.assert_allclose(matrix.ebitda_margin(), [10, 20])
+    assert list(matrix.derived_frame([ds.REVENUE]).columns) == ["Apr-24", "May-24"]
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+import dashboard_summary
+import export_report
+import snapshot
+
+
+def write_workbook(path, profitability, revenue):
+    summary = pd.DataFrame({
+        "Particulars": [dashboard_summary.REVENUE, dashboard_summary.EBITDA],
+        "Apr-24": [revenue, "120"],
+        "May-24": ["1,500", "150"],
+    })
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        profitability.to_excel(writer, sheet_name="Profitability", index=False)
+        summary.to_excel(writer, sheet_name="Dashboard Summary", index=False)
+
+
+@pytest.fixture
+def workbooks(tmp_path, profitability, monkeypatch):
+    # Worker processes are forked and inherit the patched directory
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    directory = tmp_path / "in"
+    directory.mkdir()
+    write_workbook(directory / "north.xlsx", profitability.iloc[:300], "1,000")
+    return directory
+
+
+def export(directory, output):
+    return export_report.export_directory(directory, output, formats=("html",), workers=1)
+
+
+def test_unchanged_workbook_is_skipped(workbooks, tmp_path):
+    output = tmp_path / "out"
+    first = export(workbooks, output)["north.xlsx"]
+    assert first.endswith("views rendered") and not first.startswith("0 of")
+    assert (output / export_report.output_name("north.xlsx") / "report.html").exists()
+    assert export(workbooks, output) == {"north.xlsx": "unchanged"}
+
+
+def test_only_changed_views_are_rendered(workbooks, tmp_path, profitability):
+    output = tmp_path / "out"
+    export(workbooks, output)
+    total = len(export_report.load_manifest(output / export_report.MANIFEST)["workbooks"]["north.xlsx"]["views"])
+    write_workbook(workbooks / "north.xlsx", profitability.iloc[:300], "2,000")
+    rendered = int(export(workbooks, output)["north.xlsx"].split()[0])
+    assert 0 < rendered < total
+
+
+def test_similar_names_get_separate_folders():
+    names = ["Apr 24.xlsx", "apr_24.xlsx", "APR-24.xlsx"]
+    assert len({export_report.output_name(name) for name in names}) == 3
+    assert export_report.output_name("Apr 24.xlsx") == export_report.output_name("Apr 24.xlsx")
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import aggregation
+import history_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return history_store.HistoryStore(tmp_path / "history.sqlite3")
+
+
+def aggregator(frame, dimension_columns, kpis):
+    return aggregation.aggregate_dimensions(frame, dimension_columns, kpis)
+
+
+def test_guess_period():
+    assert history_store.guess_period("Profitability Apr-24.xlsx") == "2024-04"
+    assert history_store.guess_period("cxo_2024_11.xlsx") == "2024-11"
+    assert history_store.guess_period("workbook.xlsx") is None
+
+
+def test_ingest_and_range_queries(store, profitability, dimension_columns, kpis):
+    april, may = profitability.iloc[:2500], profitability.iloc[2500:]
+    assert store.ingest("a", "2024-04", "apr.xlsx", aggregator(april, dimension_columns, kpis))
+    assert store.ingest("b", "2024-05", "may.xlsx", aggregator(may, dimension_columns, kpis))
+    assert not store.ingest("a", "2024-04", "apr.xlsx", aggregator(april, dimension_columns, kpis))
+    assert store.periods() == ["2024-04", "2024-05"]
+
+    result = store.dimension_by_period("Product", ["GMV"], "2024-04", "2024-05")
+    for period, part in (("2024-04", april), ("2024-05", may)):
+        expected = part.groupby("Product Name")["GMV"].sum()
+        got = result[result["period"] == period].set_index("Product")["GMV"]
+        pd.testing.assert_series_equal(got, expected, check_names=False, check_index_type=False)
+
+    only_may = store.dimension_by_period("Zone", ["GMV"], "2024-05", "2024-05")
+    assert set(only_may["period"]) == {"2024-05"}
+    assert only_may["GMV"].sum() == pytest.approx(may.dropna(subset=["Zone"])["GMV"].sum())
+
+
+def test_pl_summary_long_form(store, profitability, dimension_columns, kpis):
+    pl = pd.DataFrame({"Particulars": ["Revenue", "EBITDA"], "Apr-24": ["1,200", 300.0]})
+    store.ingest("a", "2024-04", "apr.xlsx", aggregator(profitability, dimension_columns, kpis), pl)
+    rows = store.pl_by_period("2024-01", "2024-12")
+    assert rows[["particulars", "col", "value"]].values.tolist() == [["Revenue", "Apr-24", 1200.0], ["EBITDA", "Apr-24", 300.0]]
+
+
+def test_replacing_a_period_needs_confirmation(store, profitability, dimension_columns, kpis):
+    store.ingest("a", "2024-04", "apr.xlsx", aggregator(profitability.iloc[:100], dimension_columns, kpis))
+    newer = aggregator(profitability.iloc[:200], dimension_columns, kpis)
+    with pytest.raises(ValueError):
+        store.ingest("b", "2024-04", "apr-v2.xlsx", newer)
+    assert store.source("2024-04") == "apr.xlsx"
+    assert store.ingest("b", "2024-04", "apr-v2.xlsx", newer, replace=True)
+    assert store.source("2024-04") == "apr-v2.xlsx"
+    rows = store.dimension_by_period("Segment", ["GMV"], "2024-04", "2024-04")
+    assert rows["GMV"].sum() == pytest.approx(profitability.iloc[:200]["GMV"].sum())
+
+
+def test_pl_history_honours_the_range(store, profitability, dimension_columns, kpis):
+    pl = pd.DataFrame({"Particulars": ["Revenue"], "Amount": [1.0]})
+    for digest, period in (("a", "2024-03"), ("b", "2024-04"), ("c", "2024-05")):
+        store.ingest(digest, period, f"{period}.xlsx", aggregator(profitability.iloc[:50], dimension_columns, kpis), pl)
+    assert store.pl_by_period("2024-04", "2024-05")["period"].tolist() == ["2024-04", "2024-05"]
@@ -0,0 +1,56 @@
+import pytest
+
+import schema
+
+
+def test_exact_aliases_resolve():
+    column_map = schema.resolve(["Product Name", "Zone", "BD Name", "AM Name", "Segment", "State",
+                                 "Number of Transaction", "GMV", "Gross Revenue", "Bank & PG Charges",
+                                 "Referral Charges", "Net Earnings"])
+    assert column_map.dimensions == {"Product": "Product Name", "Zone": "Zone", "BD": "BD Name",
+                                     "AM": "AM Name", "Segment": "Segment", "State": "State"}
+    assert column_map.missing == []
+    assert column_map.issues == []
+
+
+@pytest.mark.parametrize("header", ["Amount", "CAMPAIGN", "Amortisation", "Gamma"])
+def test_am_does_not_match_inside_words(header):
+    assert "AM" not in schema.resolve([header]).dimensions
+
+
+@pytest.mark.parametrize("header", ["AM", "am name", "Key AM", "AM_Name", "amName"])
+def test_am_matches_whole_words(header):
+    assert schema.resolve([header]).dimensions == {"AM": header}
+
+
+def test_exact_match_wins_over_token_match():
+    column_map = schema.resolve(["Key AM", "AM Name"])
+    assert column_map.dimensions["AM"] == "AM Name"
+    assert column_map.issues == []
+
+
+def test_ambiguous_columns_are_reported():
+    column_map = schema.resolve(["Key AM", "Backup AM"])
+    assert column_map.dimensions["AM"] == "Key AM"
+    assert len(column_map.issues) == 1 and "Backup AM" in column_map.issues[0]
+
+
+def test_column_used_for_one_field_only():
+    column_map = schema.resolve(["BD Name", "Zone Name"])
+    assert column_map.dimensions == {"BD": "BD Name", "Zone": "Zone Name"}
+
+
+def test_normalize_ignores_case_spacing_and_camel_case():
+    assert schema.normalize("  Net  EARNINGS ") == "net earnings"
+    assert schema.normalize("grossRevenue") == "gross revenue"
+    assert schema.normalize("Bank&PG Charges") == "bank & pg charges"
+
+
+def test_extra_aliases_from_file(tmp_path):
+    path = tmp_path / "aliases.json"
+    path.write_text('{"AM": ["Relationship Manager"]}')
+    aliases = schema.load_aliases(path)
+    assert schema.resolve(["Relationship Manager"], aliases).dimensions == {"AM": "Relationship Manager"}
+    path.write_text('{"Nope": ["x"]}')
+    with pytest.raises(ValueError):
+        schema.load_aliases(path)
@@ -0,0 +1,74 @@
+import datetime
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dashboard_summary
+import snapshot
+
+pytestmark = pytest.mark.skipif(not snapshot.enabled(), reason="pyarrow is not installed")
+
+
+def test_round_trip(tmp_path):
+    df = pd.DataFrame({"Zone": ["North", None, "South"], "GMV": [1, 2, 3], "Rate": [0.5, None, 1.5]})
+    assert snapshot.write_snapshot(df, "digest", "Profitability", 0, tmp_path)
+    pd.testing.assert_frame_equal(snapshot.read_snapshot("digest", "Profitability", 0, tmp_path), df)
+
+
+def test_header_modes_are_separate(tmp_path):
+    df = pd.DataFrame({0: ["a", "b"]})
+    snapshot.write_snapshot(df, "digest", "P&L Summary", None, tmp_path)
+    assert snapshot.read_snapshot("digest", "P&L Summary", 0, tmp_path) is None
+    assert snapshot.read_snapshot("digest", "P&L Summary", None, tmp_path) is not None
+
+
+def test_missing_snapshot(tmp_path):
+    assert snapshot.read_snapshot("nope", "Profitability", 0, tmp_path) is None
+
+
+def test_evict_by_age_then_size(tmp_path):
+    df = pd.DataFrame({"GMV": range(20000)})
+    digests = ["old", "mid", "new", "kept"]
+    for digest in digests:
+        snapshot.write_snapshot(df, digest, "Profitability", 0, tmp_path)
+    for i, digest in enumerate(digests):
+        used = time.time() - (40 - i) * 86400 if digest == "old" else time.time() - (10 - i) * 60
+        os.utime(tmp_path / digest, (used, used))
+    size = sum(f.stat().st_size for f in (tmp_path / "new").iterdir())
+    removed = snapshot.evict(tmp_path, keep="kept", max_age_days=30, max_total_mb=2.5 * size / (1024 * 1024))
+    assert removed == ["old", "mid"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["kept", "new"]
+
+
+def summary_sheet():
+    return pd.DataFrame({
+        "Particulars": ["Revenue from Operations (A+B+C)", "EBITDA", None],
+        datetime.datetime(2024, 4, 1): ["1,234,567", 1200.5, None],
+        "May-24": [2000, "-", "3,000"],
+        "Total": [1, 2, 3],
+    })
+
+
+def test_mixed_sheet_is_stored_as_arrow(tmp_path):
+    df = summary_sheet()
+    assert snapshot.write_snapshot(df, "digest", "Dashboard Summary", 0, tmp_path)
+    assert [p.suffix for p in (tmp_path / "digest").iterdir()] == [".arrow"]
+    back = snapshot.read_snapshot("digest", "Dashboard Summary", 0, tmp_path)
+    assert list(back.columns) == list(df.columns)
+    assert isinstance(back.columns[1], datetime.datetime)
+    assert back.iloc[:, 1].tolist()[:2] == ["1,234,567", "1200.5"] and back.iloc[2, 1] is None
+    assert back["Total"].tolist() == [1, 2, 3]
+    np.testing.assert_array_equal(
+        dashboard_summary.parse_matrix(back).values, dashboard_summary.parse_matrix(df).values
+    )
+
+
+def test_colliding_labels_keep_their_types(tmp_path):
+    df = pd.DataFrame([[1, 2, 3]], columns=[1, "1", 2.5])
+    assert snapshot.write_snapshot(df, "digest", "Sheet", None, tmp_path)
+    back = snapshot.read_snapshot("digest", "Sheet", None, tmp_path)
+    assert [(type(c), c) for c in back.columns] == [(int, 1), (str, "1"), (float, 2.5)]
+    assert back.values.tolist() == [[1, 2, 3]]
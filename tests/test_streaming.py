@@ -0,0 +1,34 @@
+import io
+
+import pandas as pd
+import pytest
+
+import streaming
+
+
+@pytest.fixture(scope="module")
+def workbook(profitability):
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        profitability.to_excel(writer, sheet_name="Profitability", index=False)
+    return buffer.getvalue()
+
+
+def test_stream_matches_groupby(workbook, profitability, dimension_columns, kpis):
+    streamed = streaming.stream_sheet(workbook, block_rows=1500, preview_rows=50)
+    assert streamed.row_count == len(profitability)
+    assert len(streamed.preview) == 50
+    for dim, col in dimension_columns.items():
+        expected = profitability.groupby(col, sort=True)[kpis].sum().reset_index()
+        got = streamed.aggregator.dimension(dim)
+        pd.testing.assert_frame_equal(got[expected.columns], expected, check_dtype=False, check_categorical=False)
+    for kpi in kpis:
+        assert streamed.totals.sums[kpi] == pytest.approx(profitability[kpi].sum())
+
+
+def test_downcast_keeps_large_values_exact():
+    frame = pd.DataFrame({"Zone": ["N", "S"], "GMV": [16777217.5, 1.0], "Count": [3, 2**40]})
+    out = streaming.downcast(frame, {"Zone": "Zone"}, ["GMV", "Count"])
+    assert out["GMV"].tolist() == [16777217.5, 1.0]
+    assert out["Count"].tolist() == [3, 2**40]
+    assert str(out["Zone"].dtype) == "category"
@@ -0,0 +1,120 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import workbook_cache
+
+
+def frame(rows):
+    return pd.DataFrame({"value": range(rows)})
+
+
+def test_get_or_load_loads_once():
+    cache = workbook_cache.SheetCache()
+    calls = []
+    for _ in range(3):
+        value = cache.get_or_load(("d", "Sheet", 0), lambda: calls.append(1) or frame(10))
+    assert len(calls) == 1
+    assert value.equals(frame(10))
+
+
+def test_size_budget_evicts_least_recently_used():
+    one = workbook_cache.frame_nbytes(frame(100))
+    cache = workbook_cache.SheetCache(max_bytes=2 * one)
+    cache.put(("a",), frame(100))
+    cache.put(("b",), frame(100))
+    cache.get(("a",))
+    cache.put(("c",), frame(100))
+    assert ("a",) in cache and ("c",) in cache and ("b",) not in cache
+    assert cache.current_bytes == 2 * one
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = workbook_cache.SheetCache(max_bytes=10)
+    cache.put(("a",), frame(100))
+    cache.put(("b",), frame(100))
+    assert len(cache) == 1 and ("b",) in cache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = workbook_cache.SheetCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return frame(10)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(cache.get_or_load, ("d", "Sheet", 0), loader) for _ in range(8)]
+        started.wait(5)
+        time.sleep(0.05)
+        release.set()
+        results = [f.result(5) for f in futures]
+    assert len(calls) == 1 and cache.loads == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_idle_entries_expire_unless_held():
+    cache = workbook_cache.SheetCache(ttl=0.05)
+    cache.put(("a", "Sheet", 0), frame(10))
+    cache.put(("b", "Sheet", 0), frame(10))
+    cache.acquire("b", "session-1")
+    time.sleep(0.1)
+    cache.put(("c", "Sheet", 0), frame(10))
+    assert ("a", "Sheet", 0) not in cache
+    assert ("b", "Sheet", 0) in cache
+
+
+def test_held_workbooks_are_evicted_last():
+    one = workbook_cache.frame_nbytes(frame(100))
+    cache = workbook_cache.SheetCache(max_bytes=2 * one)
+    cache.put(("a", "Sheet", 0), frame(100))
+    cache.acquire("a", "session-1")
+    cache.put(("b", "Sheet", 0), frame(100))
+    cache.put(("c", "Sheet", 0), frame(100))
+    assert ("a", "Sheet", 0) in cache and ("b", "Sheet", 0) not in cache
+    cache.release("a", "session-1")
+    assert cache.refcount("a") == 0
+
+
+def test_hit_keeps_size_given_to_put():
+    cache = workbook_cache.SheetCache()
+    png = b"\x89PNG" + b"\0" * 1000
+    cache.put(("chart",), png, nbytes=len(png))
+    assert cache.get(("chart",)) is png
+    assert cache.current_bytes == len(png)
+
+
+def test_hit_remeasures_values_that_grow():
+    class Growing:
+        nbytes = 10
+
+    cache = workbook_cache.SheetCache()
+    value = Growing()
+    cache.put(("cube",), value)
+    value.nbytes = 50
+    cache.get(("cube",))
+    assert cache.current_bytes == 50
+
+
+def test_held_workbooks_are_capped_by_hard_limit():
+    one = workbook_cache.frame_nbytes(frame(100))
+    cache = workbook_cache.SheetCache(max_bytes=one, hard_max_bytes=2 * one)
+    for i, digest in enumerate("abcd"):
+        cache.acquire(digest, f"session-{i}")
+    cache.put(("a", "Sheet", 0), frame(100))
+    cache.put(("b", "Sheet", 0), frame(100))
+    assert cache.current_bytes == 2 * one  # past the budget, within the hard cap
+    cache.get(("a", "Sheet", 0))
+    cache.put(("c", "Sheet", 0), frame(100))
+    cache.put(("d", "Sheet", 0), frame(100))
+    assert [digest for digest in "abcd" if (digest, "Sheet", 0) in cache] == ["c", "d"]
+    cache.get(("c", "Sheet", 0))
+    cache.put(("a", "Sheet", 0), frame(100))
+    assert [digest for digest in "abcd" if (digest, "Sheet", 0) in cache] == ["a", "c"]
+    assert cache.current_bytes == 2 * one
@@ -0,0 +1,217 @@
+"""Process-wide cache of parsed workbook sheets and their aggregates.
+
+Streamlit reruns the whole dashboard script on every widget interaction, and
+many sessions usually look at the same monthly workbook. Sheets are parsed
+once per process and kept here keyed on the content hash of the uploaded bytes
+plus sheet name and header mode; derived values (aggregates) are keyed on the
+same digest. Entries are held in a size- and TTL-bounded LRU shared by all
+sessions.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+# Upper bound on the in-memory size of cached DataFrames (MB)
+DEFAULT_MAX_MB = int(os.environ.get("CXO_SHEET_CACHE_MB", "512"))
+# Workbooks in use by a session may take the cache past CXO_SHEET_CACHE_MB,
+# but never past this (MB); above it they are evicted too, least recently used
+# first
+DEFAULT_HARD_MAX_MB = int(os.environ.get("CXO_SHEET_CACHE_HARD_MB", str(2 * DEFAULT_MAX_MB)))
+# Entries idle for longer than this (seconds) are dropped unless a live
+# session still holds their workbook
+DEFAULT_TTL = float(os.environ.get("CXO_SHEET_CACHE_TTL", "3600"))
+# A session's hold on a workbook lapses if not renewed within this (seconds)
+LEASE_SECONDS = float(os.environ.get("CXO_SESSION_LEASE", "1800"))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return frame_nbytes(value)
+    return int(getattr(value, "nbytes", 0))
+
+
+def _digest_of(key):
+    # Keys are tuples starting with the workbook digest by convention
+    return key[0] if isinstance(key, tuple) and key else None
+
+
+class SheetCache:
+    """Thread-safe LRU of parsed DataFrames and derived values.
+
+    Bounded by total memory footprint and idle TTL. Sessions hold workbooks
+    through ``acquire``/``release`` (reference counts with a lease, so an
+    abandoned session cannot pin memory forever). Held workbooks may take the
+    cache past ``max_bytes`` but are evicted, least recently used first, once
+    it exceeds ``hard_max_bytes`` (twice ``max_bytes`` unless given).
+    Concurrent misses on the same key are deduplicated: one caller runs the
+    loader and the others wait for its result.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_MB * 1024 * 1024, ttl=DEFAULT_TTL, lease=LEASE_SECONDS,
+                 hard_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.hard_max_bytes = max(max_bytes, 2 * max_bytes if hard_max_bytes is None else hard_max_bytes)
+        self.ttl = ttl
+        self.lease = lease
+        self.current_bytes = 0
+        self.loads = 0
+        self._entries = OrderedDict()
+        self._holders = {}
+        self._inflight = {}
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry[2] = time.monotonic()
+            self._entries.move_to_end(key)
+            if not isinstance(entry[0], pd.DataFrame) and hasattr(entry[0], "nbytes"):
+                # Derived values may grow after caching (the rollup cube
+                # builds cuboids on demand), so re-read their size. Values
+                # without ``nbytes`` (chart PNG bytes) keep the size given
+                # to ``put``.
+                nbytes = _nbytes(entry[0])
+                self.current_bytes += nbytes - entry[1]
+                entry[1] = nbytes
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = _nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = [value, nbytes, time.monotonic()]
+            self.current_bytes += nbytes
+            self._evict()
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            value = self.get(key)
+            if value is not None:
+                return value
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            value = loader()
+            self.put(key, value)
+            self.loads += 1
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def acquire(self, digest, holder):
+        """Record that ``holder`` (a session id) is using ``digest``; call again to renew."""
+        with self._lock:
+            self._holders.setdefault(digest, {})[holder] = time.monotonic()
+
+    def release(self, digest, holder):
+        with self._lock:
+            holders = self._holders.get(digest, {})
+            holders.pop(holder, None)
+            if not holders:
+                self._holders.pop(digest, None)
+
+    def refcount(self, digest):
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for seen in self._holders.get(digest, {}).values() if now - seen <= self.lease)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "loads": self.loads,
+                "held_workbooks": sum(1 for digest in self._holders if self.refcount(digest)),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _drop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+    def _evict(self):
+        now = time.monotonic()
+        for digest in [d for d in self._holders if not self.refcount(d)]:
+            del self._holders[digest]
+        held = set(self._holders)
+        for key in [k for k, (_, _, used) in self._entries.items() if now - used > self.ttl]:
+            if _digest_of(key) not in held:
+                self._drop(key)
+        # Unheld entries are evicted for size first (oldest first): dropping a
+        # held workbook's sheet or aggregates would just rebuild them on the
+        # session's next rerun. Held entries go too, oldest first, once the
+        # hard cap is exceeded. The most recent entry is always kept, even if
+        # it alone exceeds the budget.
+        newest = next(reversed(self._entries), None)
+        for key in [k for k in self._entries if _digest_of(k) not in held and k != newest]:
+            if self.current_bytes <= self.max_bytes:
+                break
+            self._drop(key)
+        for key in [k for k in self._entries if _digest_of(k) in held and k != newest]:
+            if self.current_bytes <= self.hard_max_bytes:
+                break
+            self._drop(key)
+
+
+# Module state survives Streamlit reruns and is shared by every session in the
+# server process (the script is re-executed per run, imported modules are not).
+_cache = SheetCache(hard_max_bytes=DEFAULT_HARD_MAX_MB * 1024 * 1024)
+
+
+def acquire(digest, holder):
+    _cache.acquire(digest, holder)
+
+
+def release(digest, holder):
+    _cache.release(digest, holder)
+
+
+def stats():
+    return _cache.stats()
+
+
+def get_or_compute(key, compute):
+    """Cache an arbitrary derived value (e.g. aggregates) alongside the sheets.
+
+    ``key`` should start with the workbook digest so it is scoped to one file.
+    """
+    return _cache.get_or_load(key, compute)